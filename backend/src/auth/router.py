@@ -12,6 +12,8 @@ from .schemas import UserSession, CASResponse
 from ..database import SessionLocal, get_db
 from ..admin_log.service import AdminLogService
 from ..admin_log.schemas import AdminActionType
+from ..http_client import get_http_client
+from ..circuit_breaker import CircuitBreaker
 
 router = APIRouter()
 
@@ -31,53 +33,77 @@ async def cas_login():
     return RedirectResponse(url=login_url)
 
 @router.get("/cas-callback")
-async def cas_callback(ticket: str, request: Request, response: Response, db: Session = Depends(get_db)):
+async def cas_callback(
+    ticket: str,
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db),
+    client: httpx.AsyncClient = Depends(get_http_client)
+):
     try:
-        async with httpx.AsyncClient() as client:
-            debug(f"开始CAS票据验证流程，ticket参数接收成功: {ticket}")
-            validate_url = f"{CAS_SERVER_URL}/serviceValidate?ticket={ticket}&service={SERVICE_URL}"
-            debug(f"正在向CAS验证服务发送请求，目标URL: {validate_url}")
-            debug("准备发起CAS服务验证HTTP请求")
-            cas_response = await client.get(validate_url)
-            debug(f"收到CAS服务响应，状态码: {cas_response.status_code}")
-            if cas_response.status_code != 200:
-                raise HTTPException(status_code=401, detail=f"无效的CAS票据，服务器返回{cas_response.status_code}")
-            debug("开始解析CAS服务返回的JSON响应数据")
-            data = cas_response.json()
-            debug(f"用户认证状态: {data.get('authenticated')}，准备创建用户会话")
-            if not data.get('authenticated'):
-                raise HTTPException(status_code=401, detail="CAS认证失败")
-                
-            user_info = data.get('user')
-            session = AuthService.create_user_session(user_info)
-            
-            # 记录用户登录操作
-            if session and hasattr(session, 'staff_id') and hasattr(session, 'username'):
-                staff_id = session.staff_id
-                username = session.username
-                try:
-                    # 记录登录操作日志
-                    AdminLogService.log_admin_action(
-                        db=db,
-                        request=request,
-                        user_session=session,
-                        action_type=AdminActionType.OTHER,
-                        resource_type="auth",
-                        description=f"用户 {username}({staff_id}) 登录系统"
-                    )
-                except Exception as e:
-                    # 记录日志失败不应影响主要业务逻辑
-                    debug(f"记录登录日志失败: {str(e)}")
+        debug(f"开始CAS票据验证流程，ticket参数接收成功: {ticket}")
+        validate_url = f"{CAS_SERVER_URL}/serviceValidate?ticket={ticket}&service={SERVICE_URL}"
+        debug(f"正在向CAS验证服务发送请求，目标URL: {validate_url}")
+        debug("准备发起CAS服务验证HTTP请求")
+        breaker = CircuitBreaker.get("cas")
+        if not breaker.allow_request():
+            raise HTTPException(status_code=503, detail="CAS服务暂时不可用，请稍后重试")
+        recorded = False
+        try:
+            try:
+                cas_response = await client.get(validate_url)
+            except httpx.HTTPError as e:
+                breaker.record_failure(f"{type(e).__name__}: {str(e)}")
+                recorded = True
+                raise HTTPException(status_code=503, detail="CAS服务暂时不可用，请稍后重试")
+            if cas_response.status_code >= 500:
+                breaker.record_failure(f"HTTP {cas_response.status_code}")
+            else:
+                breaker.record_success()
+            recorded = True
+        finally:
+            # 请求被取消或出现其他异常时归还探测名额
+            if not recorded:
+                breaker.release()
+        debug(f"收到CAS服务响应，状态码: {cas_response.status_code}")
+        if cas_response.status_code != 200:
+            raise HTTPException(status_code=401, detail=f"无效的CAS票据，服务器返回{cas_response.status_code}")
+        debug("开始解析CAS服务返回的JSON响应数据")
+        data = cas_response.json()
+        debug(f"用户认证状态: {data.get('authenticated')}，准备创建用户会话")
+        if not data.get('authenticated'):
+            raise HTTPException(status_code=401, detail="CAS认证失败")
             
-            return {
-                "authenticated": True,
-                "access_token": session.access_token,
-                "user_info": {
-                    "staff_id": session.staff_id,
-                    "role": session.role
-                }
+        user_info = data.get('user')
+        session = AuthService.create_user_session(user_info)
+        
+        # 记录用户登录操作
+        if session and hasattr(session, 'staff_id') and hasattr(session, 'username'):
+            staff_id = session.staff_id
+            username = session.username
+            try:
+                # 记录登录操作日志
+                AdminLogService.log_admin_action(
+                    db=db,
+                    request=request,
+                    user_session=session,
+                    action_type=AdminActionType.OTHER,
+                    resource_type="auth",
+                    description=f"用户 {username}({staff_id}) 登录系统"
+                )
+            except Exception as e:
+                # 记录日志失败不应影响主要业务逻辑
+                debug(f"记录登录日志失败: {str(e)}")
+        
+        return {
+            "authenticated": True,
+            "access_token": session.access_token,
+            "user_info": {
+                "staff_id": session.staff_id,
+                "role": session.role
             }
-            
+        }
+        
     except HTTPException as e:
         return {
             "authenticated": False,
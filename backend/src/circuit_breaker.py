@@ -0,0 +1,185 @@
+from collections import deque
+from datetime import datetime
+from typing import Optional, Dict, Any
+import logging
+import threading
+import time
+
+from .config import CIRCUIT_BREAKER_CONFIG
+
+
+class CircuitOpenError(Exception):
+    """熔断器处于打开状态，请求未发出"""
+
+    def __init__(self, name: str):
+        super().__init__(f"外部服务 {name} 熔断中")
+        self.name = name
+
+
+class CircuitBreaker:
+    """
+    外部服务熔断器（进程内）
+
+    按最近 window_size 次调用统计失败率，调用数不少于 min_calls 且失败率
+    达到阈值时打开熔断，open_seconds 内的请求直接走降级逻辑；之后进入半开状态，
+    只放行 half_open_max_calls 个探测请求，探测成功则恢复，失败则重新打开。
+    """
+    logger = logging.getLogger('vote_service')
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    _registry: Dict[str, "CircuitBreaker"] = {}
+    _registry_lock = threading.Lock()
+
+    def __init__(self, name: str, window_size: int, min_calls: int, failure_rate_threshold: float,
+                 open_seconds: float, half_open_max_calls: int):
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_rate_threshold = failure_rate_threshold
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = half_open_max_calls
+
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._outcomes: deque = deque(maxlen=window_size)
+        self._opened_at = 0.0
+        self._half_open_calls = 0
+        self._probe_started_at = 0.0
+
+        self.trips_total = 0
+        self.rejected_total = 0
+        self.calls_total = 0
+        self.failures_total = 0
+        self.last_trip_at: Optional[datetime] = None
+        self.last_error: Optional[str] = None
+
+    @classmethod
+    def get(cls, name: str) -> "CircuitBreaker":
+        """按名称获取熔断器，参数取自 CIRCUIT_BREAKER_CONFIG"""
+        with cls._registry_lock:
+            breaker = cls._registry.get(name)
+            if breaker is None:
+                breaker = cls(name, **CIRCUIT_BREAKER_CONFIG[name])
+                cls._registry[name] = breaker
+            return breaker
+
+    @classmethod
+    def get_all_stats(cls) -> Dict[str, Dict[str, Any]]:
+        for name in CIRCUIT_BREAKER_CONFIG:
+            cls.get(name)
+        with cls._registry_lock:
+            breakers = list(cls._registry.values())
+        return {breaker.name: breaker.get_stats() for breaker in breakers}
+
+    def _failure_rate(self) -> float:
+        if not self._outcomes:
+            return 0.0
+        return self._outcomes.count(False) / len(self._outcomes)
+
+    def _refresh_state(self):
+        # 调用方需持有 self._lock
+        now = time.monotonic()
+        if self._state == self.OPEN and now - self._opened_at >= self.open_seconds:
+            self._state = self.HALF_OPEN
+            self._half_open_calls = 0
+        elif (self._state == self.HALF_OPEN and self._half_open_calls
+              and now - self._probe_started_at >= self.open_seconds):
+            # 探测请求超过open_seconds仍未记录结果，视为丢失，重新放行探测
+            self._half_open_calls = 0
+
+    def _trip(self):
+        self._state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+        self.trips_total += 1
+        self.last_trip_at = datetime.now()
+        self.logger.warning(f"外部服务 {self.name} 熔断打开，{self.open_seconds} 秒后尝试恢复: {self.last_error}")
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._refresh_state()
+            return self._state
+
+    def allow_request(self) -> bool:
+        """
+        判断是否放行本次调用，放行后调用方必须调用 record_success、record_failure
+        或（没有结果时）release 之一
+
+        Returns:
+            False 表示熔断中，调用方应直接降级
+        """
+        with self._lock:
+            self._refresh_state()
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.HALF_OPEN and self._half_open_calls < self.half_open_max_calls:
+                self._half_open_calls += 1
+                self._probe_started_at = time.monotonic()
+                return True
+            self.rejected_total += 1
+            return False
+
+    def check(self):
+        """放行时不做任何事，熔断中抛出 CircuitOpenError"""
+        if not self.allow_request():
+            raise CircuitOpenError(self.name)
+
+    def record_success(self):
+        with self._lock:
+            self.calls_total += 1
+            if self._state == self.OPEN:
+                return
+            if self._state == self.HALF_OPEN:
+                self._state = self.CLOSED
+                self._outcomes.clear()
+                self.logger.info(f"外部服务 {self.name} 探测成功，熔断关闭")
+            self._outcomes.append(True)
+
+    def record_failure(self, error: Optional[str] = None):
+        with self._lock:
+            self.calls_total += 1
+            self.failures_total += 1
+            self.last_error = error
+            if self._state == self.HALF_OPEN:
+                self._trip()
+                return
+            if self._state == self.OPEN:
+                # 打开前已放行的请求返回失败，不重复计入
+                return
+            self._outcomes.append(False)
+            if len(self._outcomes) >= self.min_calls and self._failure_rate() >= self.failure_rate_threshold:
+                self._trip()
+
+    def release(self):
+        """放行的调用被取消、没有结果时归还半开状态的探测名额"""
+        with self._lock:
+            if self._state == self.HALF_OPEN and self._half_open_calls > 0:
+                self._half_open_calls -= 1
+
+    def reset(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._outcomes.clear()
+            self._half_open_calls = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._refresh_state()
+            retry_in = 0.0
+            if self._state == self.OPEN:
+                retry_in = max(0.0, self.open_seconds - (time.monotonic() - self._opened_at))
+            return {
+                "state": self._state,
+                "failure_rate": round(self._failure_rate(), 3),
+                "window_calls": len(self._outcomes),
+                "calls_total": self.calls_total,
+                "failures_total": self.failures_total,
+                "rejected_total": self.rejected_total,
+                "trips_total": self.trips_total,
+                "last_trip_at": self.last_trip_at,
+                "last_error": self.last_error,
+                "retry_in_seconds": round(retry_in, 1)
+            }
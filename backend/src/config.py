@@ -8,8 +8,12 @@ BASE_DIR = Path(__file__).parent.parent
 UPLOAD_DIR = BASE_DIR / "uploads"
 IMAGES_DIR = UPLOAD_DIR / "images"
 
+# 后台导出任务生成的文件
+EXPORT_DIR = BASE_DIR / "exports"
+
 # 确保目录存在
 os.makedirs(IMAGES_DIR, exist_ok=True)
+os.makedirs(EXPORT_DIR, exist_ok=True)
 
 # 图片相关配置
 IMAGE_CONFIG = {
@@ -18,4 +22,121 @@ IMAGE_CONFIG = {
 }
 
 # 基础URL配置（实际部署时需要修改）
-BASE_URL = "http://localhost:8000" 
\ No newline at end of file
+BASE_URL = "http://localhost:8000"
+
+# 投票写入队列配置（Redis Stream 写后缓冲，由后台线程批量写入MySQL）
+BALLOT_QUEUE_CONFIG = {
+    "enabled": False,  # 开启后 /vote/vote/batch 先写入Redis再异步落库
+    "stream": "vote:ballot_stream",
+    "group": "ballot_flusher",
+    "dead_letter_stream": "vote:ballot_dead_letter",  # 无法写入的选票连同错误信息移入该Stream
+    "batch_size": 500,  # 每个事务最多写入的选票数
+    "block_ms": 1000,  # 队列为空时的阻塞等待时间
+    "claim_idle_ms": 60000,  # 超过该时间未确认的消息会被重新认领
+}
+
+# 活动配置进程内缓存（通过Redis中的版本号在各worker间失效）
+ACTIVITY_CACHE_CONFIG = {
+    "version_key": "vote:activity_version",
+    "version_check_interval": 2,  # 秒，各worker最迟在该时间内感知到活动配置变化
+}
+
+# 已投票人员集合配置（投票前在Redis SET中占位）
+VOTER_REGISTRY_CONFIG = {
+    "claim_ttl": 600,  # 秒，占位后尚未落库的最长时间（需覆盖队列模式的落库延迟），超时后视为残留占位
+}
+
+# 投票请求幂等键配置（Idempotency-Key 请求头）
+IDEMPOTENCY_CONFIG = {
+    "result_ttl": 600,  # 秒，保存首次请求结果的时间
+    "lock_ttl": 30,  # 秒，请求处理中占位的有效期，处理期间每隔三分之一有效期续期一次
+}
+
+# 实时计票配置（Redis HASH 计数，定期从votes表校准）
+TALLY_CONFIG = {
+    "reconcile_interval": 300,  # 秒，校准任务执行间隔
+    "update_channel": "vote:tally:updates",  # 计票变化时发布通知的pub/sub频道
+}
+
+# 实时结果推送配置（/vote/active-statistics/stream）
+LIVE_RESULTS_CONFIG = {
+    "tick_seconds": 1,  # 每个worker最多每秒计算一次结果
+    "full_refresh_seconds": 30,  # 没有收到计票通知时的兜底刷新间隔
+    "keepalive_seconds": 15,  # SSE心跳间隔
+    "queue_size": 100,  # 每个连接最多缓存的事件数
+}
+
+# 学生信息查询配置（class101接口 + 进程内LRU + Redis两级缓存）
+STUDENT_INFO_CONFIG = {
+    "url": "https://class101.nuaa.edu.cn/stu_info/xgh/{stuff_id}",
+    "local_max_size": 10000,  # 进程内LRU最多缓存的条目数
+    "hit_ttl": 7 * 86400,  # 秒，查询成功的缓存时间
+    "miss_ttl": 300,  # 秒，查无此人或接口出错的缓存时间
+    "concurrency": 20,  # 同时向class101发出的最大请求数
+    "request_timeout": 3.0,  # 秒，单次请求超时时间
+    "deadline": 30.0,  # 秒，一次批量查询的总时限，超时的条目标记为未补全
+}
+
+# 本地学生目录增量刷新配置
+STUDENT_DIRECTORY_CONFIG = {
+    "refresh_age_days": 30,  # 超过该天数未更新的条目会被重新查询
+    "refresh_batch_size": 500,  # 每次刷新最多查询的人数
+}
+
+# 全局共享HTTP客户端配置（CAS验证、学院信息、学生信息共用一个连接池）
+HTTP_CLIENT_CONFIG = {
+    "max_connections": 100,
+    "max_keepalive_connections": 20,
+    "keepalive_expiry": 30.0,  # 秒，空闲连接保留时间
+    "timeout": 5.0,  # 秒，默认请求超时
+    "http2": False,  # 需要安装 h2 (pip install httpx[http2])
+}
+
+# 学院列表配置（/vote/colleges/ 读取进程内缓存，后台定期刷新）
+COLLEGE_CONFIG = {
+    "url": "https://class101.nuaa.edu.cn/yx_info/",
+    "request_timeout": 5.0,  # 秒
+    "refresh_interval": 6 * 3600,  # 秒，刷新成功后的下次刷新间隔
+    "retry_interval": 300,  # 秒，刷新失败后的重试间隔
+    "max_age": 3600,  # 秒，浏览器缓存时间
+}
+
+# 导出文件配置
+EXPORT_CONFIG = {
+    "chunk_size": 1000,  # 服务端游标每次读取的行数，同时是学生信息批量补全的批大小
+    "read_chunk_bytes": 64 * 1024,  # 发送临时文件时每次读取的字节数
+    "parquet_row_group_size": 100000,  # Parquet每个行组的行数
+    "parquet_compression": "zstd",
+}
+
+# 后台导出任务配置（/vote/export/jobs）
+EXPORT_JOB_CONFIG = {
+    "max_workers": 2,  # 每个worker同时执行的导出任务数
+    "retention_hours": 24,  # 导出文件保留时间
+    "cleanup_interval": 600,  # 秒，过期文件清理间隔
+    "job_timeout": 3600,  # 秒，超过该时间没有进度更新且不在本worker执行的任务视为中断
+}
+
+# 导出和预览结果缓存配置（按活动数据版本号失效）
+EXPORT_CACHE_CONFIG = {
+    "ttl": 7 * 86400,  # 秒，Redis中JSON结果的有效期，每次命中后续期
+    "max_bytes": 5 * 1024 * 1024,  # 超过该大小的JSON结果不缓存
+}
+
+# 外部服务熔断配置（按最近 window_size 次调用的失败率打开熔断）
+CIRCUIT_BREAKER_CONFIG = {
+    "class101": {
+        "window_size": 20,
+        "min_calls": 5,  # 窗口内调用数达到该值才计算失败率
+        "failure_rate_threshold": 0.5,
+        "open_seconds": 30,  # 熔断打开后多久进入半开状态
+        "half_open_max_calls": 1,  # 半开状态下放行的探测请求数
+    },
+    "cas": {
+        "window_size": 10,
+        "min_calls": 3,
+        "failure_rate_threshold": 0.5,
+        "open_seconds": 15,
+        "half_open_max_calls": 1,
+    },
+}
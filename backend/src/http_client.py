@@ -0,0 +1,114 @@
+from typing import Optional, Dict, Any
+import logging
+
+import httpx
+
+from .config import HTTP_CLIENT_CONFIG
+
+
+class HttpClientManager:
+    """
+    应用生命周期内共享的HTTP客户端
+
+    在FastAPI lifespan中创建，CAS验证、学院信息和学生信息查询共用同一个
+    连接池，复用keep-alive连接，避免每个请求重新建立TCP/TLS连接。
+    """
+    logger = logging.getLogger(__name__)
+
+    _client: Optional[httpx.AsyncClient] = None
+    _transport: Optional[httpx.AsyncHTTPTransport] = None
+    _requests_total = 0
+    _responses_total = 0
+    _errors_total = 0
+    _in_flight = 0
+
+    @staticmethod
+    def _http2_available() -> bool:
+        try:
+            import h2  # noqa: F401
+            return True
+        except ImportError:
+            return False
+
+    @classmethod
+    def start(cls) -> httpx.AsyncClient:
+        if cls._client is not None and not cls._client.is_closed:
+            return cls._client
+        http2 = HTTP_CLIENT_CONFIG["http2"] and cls._http2_available()
+        if HTTP_CLIENT_CONFIG["http2"] and not http2:
+            cls.logger.warning("未安装h2，HTTP客户端使用HTTP/1.1")
+        cls._transport = httpx.AsyncHTTPTransport(
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=HTTP_CLIENT_CONFIG["max_connections"],
+                max_keepalive_connections=HTTP_CLIENT_CONFIG["max_keepalive_connections"],
+                keepalive_expiry=HTTP_CLIENT_CONFIG["keepalive_expiry"]
+            )
+        )
+        cls._client = httpx.AsyncClient(
+            timeout=HTTP_CLIENT_CONFIG["timeout"],
+            transport=_CountingTransport(cls._transport)
+        )
+        return cls._client
+
+    @classmethod
+    def get_client(cls) -> httpx.AsyncClient:
+        """获取共享客户端，未在lifespan中创建时（如命令行脚本）按需创建"""
+        return cls.start()
+
+    @classmethod
+    async def close(cls):
+        if cls._client is not None:
+            await cls._client.aclose()
+            cls._client = None
+            cls._transport = None
+
+    @classmethod
+    def get_pool_stats(cls) -> Dict[str, Any]:
+        """连接池监控数据"""
+        stats = {
+            "started": cls._client is not None and not cls._client.is_closed,
+            "http2": HTTP_CLIENT_CONFIG["http2"] and cls._http2_available(),
+            "max_connections": HTTP_CLIENT_CONFIG["max_connections"],
+            "max_keepalive_connections": HTTP_CLIENT_CONFIG["max_keepalive_connections"],
+            "requests_total": cls._requests_total,
+            "responses_total": cls._responses_total,
+            "errors_total": cls._errors_total,
+            "in_flight_requests": cls._in_flight,
+        }
+        # httpx未公开连接池状态，这里读取httpcore连接池的连接列表
+        pool = getattr(cls._transport, "_pool", None)
+        connections = getattr(pool, "connections", None)
+        if connections is not None:
+            stats["connections"] = len(connections)
+            stats["idle_connections"] = sum(1 for connection in connections if connection.is_idle())
+        return stats
+
+
+class _CountingTransport(httpx.AsyncBaseTransport):
+    """包装连接池传输层，统计请求数、响应数、失败数和进行中的请求数"""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport):
+        self._transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        HttpClientManager._requests_total += 1
+        HttpClientManager._in_flight += 1
+        try:
+            response = await self._transport.handle_async_request(request)
+        except BaseException:
+            # 超时、连接失败或请求被取消
+            HttpClientManager._errors_total += 1
+            raise
+        finally:
+            HttpClientManager._in_flight -= 1
+        HttpClientManager._responses_total += 1
+        return response
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+async def get_http_client() -> httpx.AsyncClient:
+    """FastAPI依赖：注入共享HTTP客户端"""
+    return HttpClientManager.get_client()
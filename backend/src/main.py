@@ -9,6 +9,7 @@ from datetime import datetime
 from typing import Optional, List
 import os
 from pathlib import Path
+from contextlib import asynccontextmanager
 
 from .auth.router import router as auth_router
 from .admin.router import router as admin_router
@@ -17,12 +18,56 @@ from .admin_log.router import router as admin_log_router
 from .database import init_db
 from backend.src import database
 from .config import UPLOAD_DIR
+from .vote.ballot_queue import BallotQueue
+from .vote.voter_registry import VoterRegistry
+from .vote.tally import TallyStore
+from .vote.rollup import VoteRollup
+from .vote.live_results import LiveResultsBroadcaster
+from .vote.colleges import CollegeCatalog
+from .vote.export_jobs import ExportJobService
+from .http_client import HttpClientManager
+from .circuit_breaker import CircuitBreaker
+from .auth.dependencies import check_roles
+from .auth.constants import AdminType
 
 # 不需要再次创建上传目录，配置文件已经创建了
 # UPLOAD_DIR = Path("./uploads")
 # os.makedirs(UPLOAD_DIR / "images", exist_ok=True)
 
-app = FastAPI(title="Vote API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 创建CAS验证、学院信息和学生信息共用的HTTP连接池
+    HttpClientManager.start()
+    db = database.SessionLocal()
+    try:
+        # 为升级前已有投票的活动补建分钟级预聚合数据
+        VoteRollup.backfill_missing(db)
+    except Exception as e:
+        logging.getLogger(__name__).error(f"补建投票预聚合数据失败: {str(e)}")
+    try:
+        # 从votes表重建激活活动的已投票集合
+        VoterRegistry.rebuild_active(db)
+    except Exception as e:
+        logging.getLogger(__name__).error(f"重建投票人集合失败: {str(e)}")
+    finally:
+        db.close()
+    # 启动投票写入队列的后台刷写线程（未开启队列模式时不启动）
+    BallotQueue.start_flusher()
+    # 定期从votes表校准实时计票
+    TallyStore.start_reconciler()
+    # 加载学院列表并定期从class101刷新
+    CollegeCatalog.start()
+    # 定期清理过期的后台导出文件
+    ExportJobService.start()
+    yield
+    await ExportJobService.stop()
+    await CollegeCatalog.stop()
+    await LiveResultsBroadcaster.stop()
+    await HttpClientManager.close()
+    TallyStore.stop_reconciler()
+    BallotQueue.stop_flusher()
+
+app = FastAPI(title="Vote API", lifespan=lifespan)
 
 # Include routers
 app.include_router(auth_router, prefix="/auth", tags=["auth"])
@@ -61,6 +106,16 @@ app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
 def read_root():
     return {"status": "healthy", "message": "Vote API is running"}
 
+# HTTP connection pool statistics
+@app.get("/http-pool/stats")
+def get_http_pool_stats(_= Depends(check_roles(allowed_admin_types=[AdminType.school]))):
+    return HttpClientManager.get_pool_stats()
+
+# External service circuit breaker state
+@app.get("/circuit-breakers/stats")
+def get_circuit_breaker_stats(_= Depends(check_roles(allowed_admin_types=[AdminType.school]))):
+    return CircuitBreaker.get_all_stats()
+
 # Request logging middleware
 @app.middleware('http')
 async def log_requests(request: Request, call_next):
@@ -21,7 +21,8 @@ class VoteActivity(Base):
     associations: Mapped[list["ActivityCandidateAssociation"]] = relationship(
         back_populates="activity",
         cascade='all, delete-orphan',
-        passive_deletes=True
+        passive_deletes=True,
+        order_by="ActivityCandidateAssociation.position"
     )
 
     @classmethod
@@ -77,6 +78,28 @@ class Vote(Base):
         UniqueConstraint('activity_id', 'candidate_id', 'voter_id', name='uq_vote_record'),
     )
 
+class VoteMinuteBucket(Base):
+    """按分钟预聚合的得票数，随选票写入在同一事务中增量维护"""
+    __tablename__ = "vote_minute_buckets"
+
+    activity_id: Mapped[int] = mapped_column(ForeignKey("vote_activities.id", ondelete='CASCADE'), primary_key=True)
+    candidate_id: Mapped[int] = mapped_column(ForeignKey("candidates.id", ondelete='CASCADE'), primary_key=True)
+    bucket_start: Mapped[datetime] = mapped_column(DateTime(timezone=True), primary_key=True)  # 截断到分钟的投票时间
+    vote_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+
+
+class StudentDirectory(Base):
+    """本地学生目录，数据来自class101，用于在SQL中按投票人学院统计"""
+    __tablename__ = "student_directory"
+
+    staff_id: Mapped[str] = mapped_column(String(50), primary_key=True)  # 学号/工号
+    name: Mapped[str] = mapped_column(String(50), nullable=True)
+    college_id: Mapped[str] = mapped_column(String(50), index=True, nullable=True)
+    college_name: Mapped[str] = mapped_column(String(100), nullable=True)
+    major: Mapped[str] = mapped_column(String(100), nullable=True)
+    grade: Mapped[str] = mapped_column(String(20), nullable=True)
+    student_type: Mapped[str] = mapped_column(String(50), nullable=True)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
 class AdminType(str, Enum):
     SCHOOL = "school"
@@ -120,6 +143,29 @@ class AdminLog(Base):
     user_agent: Mapped[str] = mapped_column(String(200), nullable=True)  # 用户代理
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
 
+class ExportJob(Base):
+    """后台导出任务，与发起导出时记录的EXPORT操作日志一一对应"""
+    __tablename__ = "export_jobs"
+
+    id: Mapped[str] = mapped_column(String(32), primary_key=True)  # 任务ID
+    admin_log_id: Mapped[int] = mapped_column(Integer, ForeignKey("admin_logs.id"), index=True, nullable=True)
+    admin_id: Mapped[str] = mapped_column(String(50), index=True)  # 发起人工号
+    activity_id: Mapped[int] = mapped_column(Integer, index=True)
+    export_type: Mapped[str] = mapped_column(String(50))
+    export_format: Mapped[str] = mapped_column(String(20))
+    params: Mapped[str] = mapped_column(Text)  # 筛选条件（JSON）
+    status: Mapped[str] = mapped_column(String(20), index=True, default="pending")  # pending/running/completed/failed/expired
+    processed_rows: Mapped[int] = mapped_column(Integer, default=0)
+    total_rows: Mapped[int] = mapped_column(Integer, nullable=True)
+    file_path: Mapped[str] = mapped_column(String(255), nullable=True)
+    file_size: Mapped[int] = mapped_column(Integer, nullable=True)
+    error: Mapped[str] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())  # 状态或进度最后更新时间
+    started_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=True)
+    finished_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=True)
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=True)  # 文件保留截止时间
+
 class ApplicationStatus(str, Enum):
     PENDING = "pending"
     APPROVED = "approved"
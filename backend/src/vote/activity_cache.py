@@ -0,0 +1,150 @@
+from sqlalchemy.orm import Session
+from datetime import datetime
+from typing import Optional, Dict, NamedTuple, FrozenSet, Tuple, Callable, Any
+import logging
+import threading
+import time
+
+from ..auth.service import AuthService
+from ..config import ACTIVITY_CACHE_CONFIG
+from ..models import VoteActivity, ActivityCandidateAssociation
+
+
+class ActivitySnapshot(NamedTuple):
+    """投票校验所需的活动配置快照（不可变）"""
+    id: int
+    title: str
+    is_active: bool
+    start_time: datetime
+    end_time: datetime
+    min_votes: int
+    max_votes: int
+    candidate_ids: FrozenSet[int]
+    candidate_order: Tuple[int, ...]  # 按position排序的候选人ID
+
+
+class ActivityCache:
+    """
+    进程内活动配置缓存
+
+    活动增删改时递增Redis中的版本号，各worker每隔
+    version_check_interval 秒比对一次版本号，不一致时清空本地缓存。
+    活动配置变更频率很低，使用一个全局版本号即可，同时也能覆盖
+    deactivate_others 这类影响其他活动的修改。
+    """
+    logger = logging.getLogger('vote_service')
+
+    _lock = threading.Lock()
+    _snapshots: Dict[int, ActivitySnapshot] = {}
+    _derived: Dict[str, Any] = {}
+    _version: Optional[bytes] = None
+    _checked_at = 0.0
+    _generation = 0  # 本地缓存每次清空时递增，加载期间发生变化的结果不写入缓存
+
+    @classmethod
+    def _sync_version(cls):
+        now = time.monotonic()
+        if now - cls._checked_at < ACTIVITY_CACHE_CONFIG["version_check_interval"]:
+            return
+        try:
+            version = AuthService.redis_client.get(ACTIVITY_CACHE_CONFIG["version_key"])
+        except Exception as e:
+            # 无法确认版本号时不使用缓存
+            cls.logger.error(f"读取活动缓存版本失败: {str(e)}")
+            with cls._lock:
+                cls._snapshots.clear()
+                cls._derived.clear()
+                cls._generation += 1
+                cls._checked_at = 0.0
+            return
+        with cls._lock:
+            if version != cls._version:
+                cls._snapshots.clear()
+                cls._derived.clear()
+                cls._generation += 1
+                cls._version = version
+            cls._checked_at = now
+
+    @staticmethod
+    def _load(db: Session, activity_id: int) -> Optional[ActivitySnapshot]:
+        activity = db.query(VoteActivity).filter(VoteActivity.id == activity_id).first()
+        if not activity:
+            return None
+        candidate_order = tuple(
+            cid for (cid,) in db.query(ActivityCandidateAssociation.candidate_id).filter(
+                ActivityCandidateAssociation.activity_id == activity_id
+            ).order_by(ActivityCandidateAssociation.position)
+        )
+        return ActivitySnapshot(
+            id=activity.id,
+            title=activity.title,
+            is_active=activity.is_active,
+            start_time=activity.start_time,
+            end_time=activity.end_time,
+            min_votes=activity.min_votes,
+            max_votes=activity.max_votes,
+            candidate_ids=frozenset(candidate_order),
+            candidate_order=candidate_order
+        )
+
+    @classmethod
+    def get(cls, db: Session, activity_id: int) -> Optional[ActivitySnapshot]:
+        """
+        获取活动快照，缓存未命中时从数据库加载
+
+        Returns:
+            活动快照，活动不存在时返回None
+        """
+        cls._sync_version()
+        snapshot = cls._snapshots.get(activity_id)
+        if snapshot is not None:
+            return snapshot
+
+        generation = cls._generation
+        snapshot = cls._load(db, activity_id)
+        if snapshot is not None:
+            with cls._lock:
+                if cls._checked_at and cls._generation == generation:
+                    cls._snapshots[activity_id] = snapshot
+        return snapshot
+
+    @classmethod
+    def get_derived(cls, name: str, loader: Callable[[], Any]) -> Any:
+        """
+        获取由活动配置派生的缓存数据（如激活活动列表），随版本号一起失效
+
+        Args:
+            name: 缓存名称
+            loader: 缓存未命中时的加载函数
+
+        Returns:
+            缓存数据，调用方不应修改
+        """
+        cls._sync_version()
+        if name in cls._derived:
+            return cls._derived[name]
+
+        generation = cls._generation
+        value = loader()
+        with cls._lock:
+            if cls._checked_at and cls._generation == generation:
+                cls._derived[name] = value
+        return value
+
+    @classmethod
+    def invalidate(cls, activity_id: Optional[int] = None):
+        """
+        活动配置变更后调用，递增版本号使所有worker的缓存失效
+
+        Args:
+            activity_id: 发生变化的活动ID，仅用于日志
+        """
+        with cls._lock:
+            cls._snapshots.clear()
+            cls._derived.clear()
+            cls._generation += 1
+            cls._checked_at = 0.0
+        try:
+            AuthService.redis_client.incr(ACTIVITY_CACHE_CONFIG["version_key"])
+        except Exception as e:
+            cls.logger.error(f"活动 {activity_id} 缓存失效通知失败: {str(e)}")
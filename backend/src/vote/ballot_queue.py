@@ -0,0 +1,309 @@
+from sqlalchemy import insert, tuple_
+from sqlalchemy.exc import IntegrityError, DataError
+from datetime import datetime
+from typing import Optional, List, Dict, Any
+import logging
+import json
+import os
+import socket
+import threading
+import time
+
+import redis
+
+from ..auth.service import AuthService
+from ..config import BALLOT_QUEUE_CONFIG
+from ..database import SessionLocal
+from ..models import Vote
+from .rollup import VoteRollup
+from .voter_registry import VoterRegistry
+
+
+class BallotQueue:
+    """
+    投票写后队列
+
+    选票校验通过后写入Redis Stream并立即返回，由后台线程按批次
+    读取、去重后写入votes表。消息在事务提交后才确认(XACK)，
+    进程崩溃时未确认的消息会被其他消费者重新认领，保证至少写入一次；
+    无法解析或数据不合法的消息移入死信Stream，不会阻塞后续选票。
+    """
+    logger = logging.getLogger('vote_service')
+
+    _thread: Optional[threading.Thread] = None
+    _stop_event = threading.Event()
+    _consumer = f"{socket.gethostname()}-{os.getpid()}"
+    _last_flush_at: Optional[datetime] = None
+    _last_flush_count = 0
+
+    @staticmethod
+    def enabled() -> bool:
+        return bool(BALLOT_QUEUE_CONFIG["enabled"])
+
+    @classmethod
+    def enqueue(cls, voter_id: str, activity_id: int, candidate_ids: List[int]) -> str:
+        """
+        将一张已校验的选票追加到队列
+
+        Returns:
+            Stream中的消息ID
+        """
+        entry_id = AuthService.redis_client.xadd(BALLOT_QUEUE_CONFIG["stream"], {
+            "voter_id": voter_id,
+            "activity_id": str(activity_id),
+            "candidate_ids": json.dumps(candidate_ids),
+            "created_at": datetime.now().isoformat()
+        })
+        return entry_id.decode() if isinstance(entry_id, bytes) else entry_id
+
+    @classmethod
+    def _ensure_group(cls):
+        try:
+            AuthService.redis_client.xgroup_create(
+                BALLOT_QUEUE_CONFIG["stream"], BALLOT_QUEUE_CONFIG["group"], id="0", mkstream=True
+            )
+        except redis.ResponseError as e:
+            # 消费组已存在
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    @staticmethod
+    def _decode(fields: Dict[bytes, bytes]) -> Dict[str, Any]:
+        data = {k.decode(): v.decode() for k, v in fields.items()}
+        return {
+            "voter_id": data["voter_id"],
+            "activity_id": int(data["activity_id"]),
+            "candidate_ids": json.loads(data["candidate_ids"]),
+            "created_at": datetime.fromisoformat(data["created_at"])
+        }
+
+    @classmethod
+    def _read_batch(cls) -> List[tuple]:
+        """先认领其他消费者遗留的超时消息，没有时再读取新消息"""
+        client = AuthService.redis_client
+        stream = BALLOT_QUEUE_CONFIG["stream"]
+        group = BALLOT_QUEUE_CONFIG["group"]
+        batch_size = BALLOT_QUEUE_CONFIG["batch_size"]
+
+        claimed = client.xautoclaim(
+            stream, group, cls._consumer,
+            min_idle_time=BALLOT_QUEUE_CONFIG["claim_idle_ms"],
+            start_id="0-0",
+            count=batch_size
+        )
+        entries = [entry for entry in claimed[1] if entry[1]]
+        if entries:
+            return entries
+
+        response = client.xreadgroup(
+            group, cls._consumer, {stream: ">"},
+            count=batch_size,
+            block=BALLOT_QUEUE_CONFIG["block_ms"]
+        )
+        return response[0][1] if response else []
+
+    @staticmethod
+    def _vote_rows(ballots: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return [
+            {
+                "candidate_id": cid,
+                "voter_id": ballot["voter_id"],
+                "activity_id": ballot["activity_id"],
+                "created_at": ballot["created_at"]
+            }
+            for ballot in ballots
+            for cid in ballot["candidate_ids"]
+        ]
+
+    @classmethod
+    def _write(cls, ballots: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        在一个事务中写入选票，已落库的选票整张跳过
+
+        重复写入（与同步投票路径竞争）由 uq_vote_record 抛出IntegrityError，
+        不使用INSERT IGNORE，保证预聚合和实时计数只累加真正写入的行
+
+        Returns:
+            实际写入的选票
+        """
+        db = SessionLocal()
+        try:
+            # 重新投递的消息可能已经落库
+            existing = set(db.query(Vote.activity_id, Vote.voter_id).filter(
+                tuple_(Vote.activity_id, Vote.voter_id).in_(
+                    [(ballot["activity_id"], ballot["voter_id"]) for ballot in ballots]
+                )
+            ).distinct().all())
+            pending = [ballot for ballot in ballots if (ballot["activity_id"], ballot["voter_id"]) not in existing]
+            rows = cls._vote_rows(pending)
+            if rows:
+                db.execute(insert(Vote).values(rows))
+                VoteRollup.apply(db, rows)
+            db.commit()
+            return pending
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    @classmethod
+    def _write_one_by_one(cls, ballots: List[Dict[str, Any]], dead_letters: List[tuple]) -> List[Dict[str, Any]]:
+        """
+        整批写入失败后逐张写入，数据不合法的选票（如候选人已被删除）放入死信队列
+
+        Returns:
+            实际写入的选票
+        """
+        written = []
+        for ballot in ballots:
+            try:
+                written.extend(cls._write([ballot]))
+            except IntegrityError as e:
+                if e.orig is not None and e.orig.args and e.orig.args[0] == 1062:
+                    # 同一投票人的选票已由其他路径写入
+                    continue
+                dead_letters.append((ballot["entry_id"], ballot["fields"], str(e.orig or e), ballot))
+            except DataError as e:
+                dead_letters.append((ballot["entry_id"], ballot["fields"], str(e.orig or e), ballot))
+        return written
+
+    @classmethod
+    def _dead_letter(cls, dead_letters: List[tuple]):
+        """将无法写入的消息连同错误信息放入死信Stream，并释放投票人占位"""
+        client = AuthService.redis_client
+        pipe = client.pipeline(transaction=False)
+        for entry_id, fields, error, ballot in dead_letters:
+            cls.logger.error(f"投票队列消息 {entry_id} 无法写入，已移入死信队列: {error}")
+            pipe.xadd(BALLOT_QUEUE_CONFIG["dead_letter_stream"], {
+                **fields,
+                "source_id": entry_id,
+                "error": error[:1000],
+                "failed_at": datetime.now().isoformat()
+            })
+        pipe.execute()
+        for _, _, _, ballot in dead_letters:
+            if ballot is not None:
+                # 选票未落库，允许投票人重新投票
+                VoterRegistry.release(ballot["activity_id"], ballot["voter_id"])
+
+    @classmethod
+    def flush_once(cls) -> int:
+        """
+        读取一批选票并在一个事务中写入数据库
+
+        整批写入失败时逐张重试，仍然失败或无法解析的消息移入死信队列后确认，
+        不会阻塞后续选票；数据库连接等暂时性错误直接抛出，整批稍后重试
+
+        Returns:
+            本批次写入的选票数
+        """
+        entries = cls._read_batch()
+        if not entries:
+            return 0
+
+        entry_ids = [entry_id for entry_id, _ in entries]
+        ballots = {}
+        dead_letters = []
+        for entry_id, fields in entries:
+            try:
+                ballot = cls._decode(fields)
+            except (KeyError, ValueError, UnicodeDecodeError) as e:
+                dead_letters.append((entry_id, fields, f"消息解析失败: {type(e).__name__}: {str(e)}", None))
+                continue
+            ballot["entry_id"] = entry_id
+            ballot["fields"] = fields
+            # 同一批次内同一投票人只保留最早的一张选票
+            ballots.setdefault((ballot["activity_id"], ballot["voter_id"]), ballot)
+
+        batch = list(ballots.values())
+        written = []
+        if batch:
+            try:
+                written = cls._write(batch)
+            except (IntegrityError, DataError) as e:
+                cls.logger.warning(f"投票队列整批写入失败，改为逐张写入: {str(e)}")
+                written = cls._write_one_by_one(batch, dead_letters)
+
+        # 在函数内部导入，避免与service模块循环导入
+        from .service import VoteService
+        VoteService.after_ballots_committed(written)
+        if dead_letters:
+            cls._dead_letter(dead_letters)
+
+        # 事务提交后再确认并删除消息
+        client = AuthService.redis_client
+        client.xack(BALLOT_QUEUE_CONFIG["stream"], BALLOT_QUEUE_CONFIG["group"], *entry_ids)
+        client.xdel(BALLOT_QUEUE_CONFIG["stream"], *entry_ids)
+
+        cls._last_flush_at = datetime.now()
+        cls._last_flush_count = len(written)
+        return len(written)
+
+    @classmethod
+    def _run(cls):
+        cls.logger.info(f"投票队列刷写线程启动: {cls._consumer}")
+        while not cls._stop_event.is_set():
+            try:
+                cls._ensure_group()
+                cls.flush_once()
+            except Exception as e:
+                cls.logger.error(f"投票队列刷写失败: {str(e)}")
+                # 数据库或Redis异常时稍后重试，未确认的消息会被重新认领
+                cls._stop_event.wait(1)
+        cls.logger.info(f"投票队列刷写线程退出: {cls._consumer}")
+
+    @classmethod
+    def start_flusher(cls):
+        """启动后台刷写线程（未开启队列模式时不做任何事）"""
+        if not cls.enabled() or (cls._thread and cls._thread.is_alive()):
+            return
+        cls._stop_event.clear()
+        cls._thread = threading.Thread(target=cls._run, name="ballot-flusher", daemon=True)
+        cls._thread.start()
+
+    @classmethod
+    def stop_flusher(cls):
+        if not cls._thread:
+            return
+        cls._stop_event.set()
+        cls._thread.join(timeout=BALLOT_QUEUE_CONFIG["block_ms"] / 1000 + 5)
+        cls._thread = None
+
+    @classmethod
+    def get_stats(cls) -> Dict[str, Any]:
+        """
+        队列监控数据
+
+        Returns:
+            包含队列深度、未确认消息数、死信数量和刷写延迟的字典
+        """
+        client = AuthService.redis_client
+        stream = BALLOT_QUEUE_CONFIG["stream"]
+
+        # 已落库的消息会被删除，Stream长度即为未落库的选票数
+        queue_depth = client.xlen(stream)
+        pending = 0
+        flush_lag_seconds = 0.0
+        if queue_depth:
+            try:
+                pending = client.xpending(stream, BALLOT_QUEUE_CONFIG["group"])["pending"]
+            except redis.ResponseError:
+                pending = 0
+            oldest = client.xrange(stream, count=1)
+            if oldest:
+                oldest_id = oldest[0][0]
+                oldest_id = oldest_id.decode() if isinstance(oldest_id, bytes) else oldest_id
+                enqueued_ms = int(oldest_id.split("-")[0])
+                flush_lag_seconds = max(0.0, time.time() - enqueued_ms / 1000)
+
+        return {
+            "enabled": cls.enabled(),
+            "queue_depth": queue_depth,
+            "dead_letters": client.xlen(BALLOT_QUEUE_CONFIG["dead_letter_stream"]),
+            "pending": pending,
+            "flush_lag_seconds": round(flush_lag_seconds, 3),
+            "last_flush_at": cls._last_flush_at,
+            "last_flush_count": cls._last_flush_count,
+            "flusher_alive": bool(cls._thread and cls._thread.is_alive())
+        }
@@ -0,0 +1,179 @@
+from typing import Optional, List, Dict, Any, Tuple
+import asyncio
+import hashlib
+import json
+import logging
+import os
+
+import httpx
+
+from ..circuit_breaker import CircuitBreaker
+from ..config import COLLEGE_CONFIG
+from ..http_client import HttpClientManager
+
+
+class CollegeCatalog:
+    """
+    学院列表进程内缓存
+
+    启动时依次从本地缓存文件和内置列表加载，之后由后台任务定期从class101刷新，
+    刷新成功时同时更新本地缓存文件。/vote/colleges/ 只读取内存，不产生任何I/O。
+    """
+    logger = logging.getLogger('vote_service')
+
+    # 备用学院信息数据
+    FALLBACK_COLLEGES = [
+        {"YXDM":"0519000","YXDM_TEXT":"国际教育学院"},
+        {"YXDM":"0501000","YXDM_TEXT":"航空学院"},
+        {"YXDM":"0502000","YXDM_TEXT":"能源与动力学院"},
+        {"YXDM":"0503000","YXDM_TEXT":"自动化学院"},
+        {"YXDM":"0504000","YXDM_TEXT":"电子信息工程学院"},
+        {"YXDM":"0505000","YXDM_TEXT":"机电学院"},
+        {"YXDM":"0506000","YXDM_TEXT":"材料科学与技术学院"},
+        {"YXDM":"0509000","YXDM_TEXT":"经济与管理学院"},
+        {"YXDM":"0515000","YXDM_TEXT":"航天学院"},
+        {"YXDM":"0516000","YXDM_TEXT":"计算机科学与技术学院/软件学院"},
+        {"YXDM":"0507000","YXDM_TEXT":"民航学院"},
+        {"YXDM":"0525000","YXDM_TEXT":"集成电路学院"},
+        {"YXDM":"0517000","YXDM_TEXT":"马克思主义学院"},
+        {"YXDM":"0522000","YXDM_TEXT":"数学学院"},
+        {"YXDM":"0523000","YXDM_TEXT":"物理学院"},
+        {"YXDM":"0510000","YXDM_TEXT":"人文与社会科学学院"},
+        {"YXDM":"0511000","YXDM_TEXT":"艺术学院"},
+        {"YXDM":"0520000","YXDM_TEXT":"通用航空与飞行学院"},
+        {"YXDM":"0512000","YXDM_TEXT":"外国语学院"},
+        {"YXDM":"0218000","YXDM_TEXT":"教师发展与教学评估中心/高等教育研究所"},
+        {"YXDM":"0526000","YXDM_TEXT":"人工智能学院"}
+    ]
+
+    # 保存学院数据的本地文件路径
+    CACHE_FILE = os.path.join(os.path.dirname(__file__), 'college_cache.json')
+
+    _colleges: Optional[List[Dict[str, Any]]] = None
+    _etag: str = ""
+    _task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def _set(cls, colleges: List[Dict[str, Any]]):
+        body = json.dumps(colleges, ensure_ascii=False, sort_keys=True).encode("utf-8")
+        cls._colleges = colleges
+        cls._etag = f'"{hashlib.sha1(body).hexdigest()}"'
+
+    @classmethod
+    def load_initial(cls):
+        """从本地缓存文件加载，文件不存在或损坏时使用内置列表"""
+        try:
+            if os.path.exists(cls.CACHE_FILE):
+                with open(cls.CACHE_FILE, 'r', encoding='utf-8') as f:
+                    colleges = json.load(f)
+                if colleges:
+                    cls._set(colleges)
+                    return
+        except Exception as e:
+            cls.logger.error(f"读取学院缓存文件失败: {str(e)}")
+        cls._set(cls.FALLBACK_COLLEGES)
+
+    @classmethod
+    def get(cls) -> Tuple[List[Dict[str, Any]], str]:
+        """
+        获取学院列表
+
+        Returns:
+            (学院列表, ETag)
+        """
+        if cls._colleges is None:
+            cls.load_initial()
+        return cls._colleges, cls._etag
+
+    @classmethod
+    def _write_file(cls, colleges: List[Dict[str, Any]]):
+        tmp_file = f"{cls.CACHE_FILE}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(colleges, f, ensure_ascii=False)
+        os.replace(tmp_file, cls.CACHE_FILE)
+
+    @classmethod
+    async def refresh(cls) -> bool:
+        """
+        从class101刷新学院列表，失败时保留当前数据
+
+        Returns:
+            是否刷新成功
+        """
+        breaker = CircuitBreaker.get("class101")
+        if not breaker.allow_request():
+            return False
+        recorded = False
+        try:
+            try:
+                response = await HttpClientManager.get_client().get(
+                    COLLEGE_CONFIG["url"], timeout=COLLEGE_CONFIG["request_timeout"]
+                )
+            except httpx.HTTPError as e:
+                breaker.record_failure(f"{type(e).__name__}: {str(e)}")
+                recorded = True
+                cls.logger.error(f"获取学院信息错误: {str(e)}")
+                return False
+            if response.status_code >= 500:
+                breaker.record_failure(f"HTTP {response.status_code}")
+            else:
+                breaker.record_success()
+            recorded = True
+        finally:
+            # 请求被取消或出现其他异常时归还探测名额
+            if not recorded:
+                breaker.release()
+        if response.status_code != 200:
+            return False
+
+        try:
+            colleges = response.json()
+        except ValueError as e:
+            cls.logger.error(f"学院信息解析失败: {str(e)}")
+            return False
+        if not isinstance(colleges, list) or not colleges:
+            return False
+
+        changed = cls._colleges != colleges
+        cls._set(colleges)
+        if changed:
+            try:
+                await asyncio.to_thread(cls._write_file, colleges)
+            except Exception as e:
+                cls.logger.error(f"写入学院缓存文件失败: {str(e)}")
+            cls.logger.info(f"学院列表已更新，共 {len(colleges)} 个学院")
+        return True
+
+    @classmethod
+    async def _run(cls):
+        while True:
+            try:
+                ok = await cls.refresh()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                cls.logger.error(f"学院列表刷新失败: {str(e)}")
+                ok = False
+            try:
+                await asyncio.sleep(COLLEGE_CONFIG["refresh_interval"] if ok else COLLEGE_CONFIG["retry_interval"])
+            except asyncio.CancelledError:
+                break
+
+    @classmethod
+    def start(cls):
+        """加载初始数据并启动后台刷新任务，需在事件循环中调用"""
+        if cls._colleges is None:
+            cls.load_initial()
+        if cls._task is None or cls._task.done():
+            cls._task = asyncio.create_task(cls._run())
+
+    @classmethod
+    async def stop(cls):
+        if cls._task is None:
+            return
+        cls._task.cancel()
+        try:
+            await cls._task
+        except asyncio.CancelledError:
+            pass
+        cls._task = None
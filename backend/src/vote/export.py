@@ -0,0 +1,433 @@
+from datetime import datetime
+from typing import Optional, List, Dict, Any, AsyncIterator
+from urllib.parse import quote
+import asyncio
+import csv
+import io
+import logging
+import os
+import tempfile
+import uuid
+
+from fastapi.responses import StreamingResponse
+
+from ..config import EXPORT_CONFIG
+from ..database import SessionLocal
+from .export_cache import ExportCache
+from .service import VoteService
+
+
+class VoteExporter:
+    """
+    导出文件流式生成
+
+    vote_records 和 votes 通过服务端游标（yield_per）按块读取，每块处理后立即写出；
+    CSV 和 Arrow IPC 流边生成边发送，XLSX（xlsxwriter constant_memory 模式）和
+    Parquet（按行组写入）先写入临时文件后分块发送。
+    内存占用只与块大小有关，与活动的投票记录数无关。
+    """
+    logger = logging.getLogger('vote_service')
+
+    # 导出格式：(Content-Type, 文件扩展名)
+    FORMATS = {
+        "csv": ("text/csv; charset=utf-8", "csv"),
+        "excel": ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "xlsx"),
+        "parquet": ("application/vnd.apache.parquet", "parquet"),
+        "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+    }
+
+    # 需要pyarrow的格式
+    ARROW_FORMATS = ("parquet", "arrow")
+
+    # 各导出类型的列：(字段名, 表头)
+    COLUMNS = {
+        "vote_records": [
+            ("voter_id", "投票人工号"),
+            ("voter_college_name", "投票人学院"),
+            ("enriched", "学院信息已补全"),
+        ],
+        "candidate_stats": [
+            ("rank", "排名"),
+            ("candidate_name", "候选人"),
+            ("college_id", "学院代码"),
+            ("vote_count", "得票数"),
+        ],
+        "college_turnout": [
+            ("college_id", "学院代码"),
+            ("college_name", "学院"),
+            ("voter_count", "投票人数"),
+        ],
+        "votes": [
+            ("id", "投票记录ID"),
+            ("activity_id", "活动ID"),
+            ("candidate_id", "候选人ID"),
+            ("voter_id", "投票人工号"),
+            ("created_at", "投票时间"),
+        ],
+    }
+
+    # Parquet/Arrow导出的列类型，列名使用字段名
+    ARROW_TYPES = {
+        "vote_records": {"voter_id": "string", "voter_college_name": "string", "enriched": "bool"},
+        "candidate_stats": {"rank": "int32", "candidate_name": "string", "college_id": "string", "vote_count": "int64"},
+        "college_turnout": {"college_id": "string", "college_name": "string", "voter_count": "int64"},
+        "votes": {"id": "int64", "activity_id": "int32", "candidate_id": "int32", "voter_id": "string",
+                  "created_at": "timestamp"},
+    }
+
+    @classmethod
+    def check(cls, export_type: str, export_format: str, start_date: Optional[str] = None,
+              end_date: Optional[str] = None):
+        """校验导出参数，不支持时抛出ValueError（流式响应开始后无法再返回400）"""
+        for value in (start_date, end_date):
+            if value:
+                datetime.strptime(value, "%Y-%m-%d")
+        if export_type not in cls.COLUMNS:
+            raise ValueError(f"不支持的导出类型: {export_type}")
+        if export_format not in cls.FORMATS:
+            raise ValueError(f"不支持的导出格式: {export_format}")
+        if export_format == "excel":
+            try:
+                import xlsxwriter  # noqa: F401
+            except ImportError:
+                raise ValueError("服务器未安装xlsxwriter，无法导出Excel文件")
+        if export_format in cls.ARROW_FORMATS:
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                raise ValueError(f"服务器未安装pyarrow，无法导出{export_format}文件")
+
+    @staticmethod
+    async def _iter_query(build_query, *args) -> AsyncIterator[list]:
+        """通过服务端游标按块读取查询结果"""
+        # 流式响应发送期间请求依赖的会话已关闭，这里使用独立会话
+        db = SessionLocal()
+        try:
+            query = build_query(db, *args)
+            result = await asyncio.to_thread(
+                db.execute, query.statement.execution_options(yield_per=EXPORT_CONFIG["chunk_size"])
+            )
+            partitions = result.partitions()
+            while True:
+                # 游标读取是阻塞调用，放到线程中执行
+                rows = await asyncio.to_thread(next, partitions, None)
+                if rows is None:
+                    break
+                yield rows
+        finally:
+            db.close()
+
+    @classmethod
+    async def _iter_vote_records(cls, activity_id: int, college_id: Optional[str], start_date: Optional[str],
+                                 end_date: Optional[str]) -> AsyncIterator[List[Dict[str, Any]]]:
+        async for voters in cls._iter_query(VoteService.vote_records_query, activity_id, college_id, start_date, end_date):
+            yield await VoteService.format_voter_records([tuple(row) for row in voters])
+
+    @classmethod
+    async def _iter_votes(cls, activity_id: int, college_id: Optional[str], start_date: Optional[str],
+                          end_date: Optional[str]) -> AsyncIterator[List[Dict[str, Any]]]:
+        async for rows in cls._iter_query(VoteService.votes_query, activity_id, college_id, start_date, end_date):
+            yield [dict(row._mapping) for row in rows]
+
+    @staticmethod
+    async def _iter_summary(export_type: str, activity_id: int, college_id: Optional[str],
+                            start_date: Optional[str], end_date: Optional[str],
+                            exact: bool) -> AsyncIterator[List[Dict[str, Any]]]:
+        # 统计类导出的行数等于候选人数或学院数，一次取出即可
+        db = SessionLocal()
+        try:
+            if export_type == "candidate_stats":
+                data = await VoteService.get_candidate_stats(db, activity_id, college_id, start_date, end_date, exact=exact)
+            else:
+                data = await asyncio.to_thread(VoteService.get_voter_college_turnout, db, activity_id, start_date, end_date, college_id)
+        finally:
+            db.close()
+        yield data["records"]
+
+    @classmethod
+    def iter_chunks(cls, export_type: str, activity_id: int, college_id: Optional[str] = None,
+                    start_date: Optional[str] = None, end_date: Optional[str] = None,
+                    exact: bool = True) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        按块产出导出记录
+
+        Returns:
+            异步迭代器，每次产出一块记录字典
+        """
+        if export_type == "vote_records":
+            return cls._iter_vote_records(activity_id, college_id, start_date, end_date)
+        if export_type == "votes":
+            return cls._iter_votes(activity_id, college_id, start_date, end_date)
+        return cls._iter_summary(export_type, activity_id, college_id, start_date, end_date, exact)
+
+    @classmethod
+    async def _stream_csv(cls, export_type: str, chunks: AsyncIterator[List[Dict[str, Any]]]) -> AsyncIterator[bytes]:
+        columns = cls.COLUMNS[export_type]
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        # 带BOM，Excel打开时可以正确识别UTF-8中文
+        buffer.write("\ufeff")
+        writer.writerow([title for _, title in columns])
+        async for records in chunks:
+            for record in records:
+                writer.writerow([record.get(key) for key, _ in columns])
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode("utf-8")
+
+    @classmethod
+    async def _write_xlsx(cls, export_type: str, chunks: AsyncIterator[List[Dict[str, Any]]], path: str):
+        """以constant_memory模式逐行写入XLSX文件"""
+        import xlsxwriter
+
+        columns = cls.COLUMNS[export_type]
+        workbook = xlsxwriter.Workbook(path, {"constant_memory": True})
+        try:
+            worksheet = workbook.add_worksheet(export_type)
+            header_format = workbook.add_format({"bold": True})
+            for col, (_, title) in enumerate(columns):
+                worksheet.write(0, col, title, header_format)
+            row = 1
+            async for records in chunks:
+                for record in records:
+                    for col, (key, _) in enumerate(columns):
+                        worksheet.write(row, col, record.get(key))
+                    row += 1
+        finally:
+            workbook.close()
+
+    @classmethod
+    def _arrow_schema(cls, export_type: str):
+        import pyarrow as pa
+
+        types = {
+            "string": pa.string(),
+            "bool": pa.bool_(),
+            "int32": pa.int32(),
+            "int64": pa.int64(),
+            "timestamp": pa.timestamp("us"),
+        }
+        return pa.schema([(name, types[type_name]) for name, type_name in cls.ARROW_TYPES[export_type].items()])
+
+    @staticmethod
+    def _write_row_group(writer, records: List[Dict[str, Any]], schema):
+        import pyarrow as pa
+
+        writer.write_table(pa.Table.from_pylist(records, schema=schema))
+
+    @classmethod
+    async def _write_parquet(cls, export_type: str, chunks: AsyncIterator[List[Dict[str, Any]]], path: str):
+        """
+        按记录批次写入Parquet文件，每累计row_group_size行写出一个行组
+
+        转换、压缩和写文件在线程中执行，不阻塞事件循环
+        """
+        import pyarrow.parquet as pq
+
+        schema = cls._arrow_schema(export_type)
+        writer = await asyncio.to_thread(
+            pq.ParquetWriter, path, schema, compression=EXPORT_CONFIG["parquet_compression"]
+        )
+        try:
+            buffered = []
+            async for records in chunks:
+                buffered.extend(records)
+                if len(buffered) >= EXPORT_CONFIG["parquet_row_group_size"]:
+                    await asyncio.to_thread(cls._write_row_group, writer, buffered, schema)
+                    buffered = []
+            if buffered:
+                await asyncio.to_thread(cls._write_row_group, writer, buffered, schema)
+        finally:
+            await asyncio.to_thread(writer.close)
+
+    @staticmethod
+    def _write_record_batch(writer, sink: "_ChunkSink", records: List[Dict[str, Any]], schema) -> bytes:
+        import pyarrow as pa
+
+        writer.write_batch(pa.RecordBatch.from_pylist(records, schema=schema))
+        return sink.drain()
+
+    @classmethod
+    async def _stream_arrow(cls, export_type: str, chunks: AsyncIterator[List[Dict[str, Any]]]) -> AsyncIterator[bytes]:
+        """Arrow IPC流格式，每块记录在线程中转换为一个记录批次后立即发送"""
+        import pyarrow as pa
+
+        schema = cls._arrow_schema(export_type)
+        sink = _ChunkSink()
+        writer = pa.ipc.new_stream(sink, schema)
+        async for records in chunks:
+            if records:
+                yield await asyncio.to_thread(cls._write_record_batch, writer, sink, records, schema)
+        writer.close()
+        yield sink.drain()
+
+    @classmethod
+    async def _write_stream(cls, body: AsyncIterator[bytes], path: str):
+        with open(path, "wb") as f:
+            async for data in body:
+                f.write(data)
+
+    @classmethod
+    async def write_file(cls, export_type: str, export_format: str,
+                         chunks: AsyncIterator[List[Dict[str, Any]]], path: str):
+        """将导出记录写入本地文件（后台导出任务使用）"""
+        if export_format == "excel":
+            await cls._write_xlsx(export_type, chunks, path)
+        elif export_format == "parquet":
+            await cls._write_parquet(export_type, chunks, path)
+        elif export_format == "arrow":
+            await cls._write_stream(cls._stream_arrow(export_type, chunks), path)
+        else:
+            await cls._write_stream(cls._stream_csv(export_type, chunks), path)
+
+    @staticmethod
+    def count_rows(export_type: str, activity_id: int, college_id: Optional[str] = None,
+                   start_date: Optional[str] = None, end_date: Optional[str] = None) -> Optional[int]:
+        """
+        统计vote_records/votes导出的总行数，用于计算进度
+
+        Returns:
+            总行数；统计类导出返回None（行数在查询完成后才知道）
+        """
+        build_query = {
+            "vote_records": VoteService.vote_records_query,
+            "votes": VoteService.votes_query,
+        }.get(export_type)
+        if build_query is None:
+            return None
+        db = SessionLocal()
+        try:
+            return build_query(db, activity_id, college_id, start_date, end_date).order_by(None).count()
+        finally:
+            db.close()
+
+    @staticmethod
+    async def _watch_partial(chunks: AsyncIterator[List[Dict[str, Any]]],
+                             state: Dict[str, bool]) -> AsyncIterator[List[Dict[str, Any]]]:
+        """透传导出记录，记录是否有投票人学院未补全（未补全的结果不缓存）"""
+        async for records in chunks:
+            if any(record.get("enriched") is False for record in records):
+                state["partial"] = True
+            yield records
+
+    @staticmethod
+    async def _tee_to_cache(body: AsyncIterator[bytes], cache_path: str,
+                            state: Dict[str, bool]) -> AsyncIterator[bytes]:
+        """边发送边写入临时文件，完整发送且数据完整时放入缓存"""
+        tmp_path = f"{cache_path}.{uuid.uuid4().hex}.tmp"
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        completed = False
+        try:
+            with open(tmp_path, "wb") as f:
+                async for data in body:
+                    f.write(data)
+                    yield data
+            completed = True
+        finally:
+            if completed and not state["partial"]:
+                ExportCache.store_file(cache_path, tmp_path)
+            elif os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    @classmethod
+    async def _stream_file(cls, export_type: str, export_format: str, chunks: AsyncIterator[List[Dict[str, Any]]],
+                           cache_path: Optional[str] = None,
+                           state: Optional[Dict[str, bool]] = None) -> AsyncIterator[bytes]:
+        # XLSX是zip格式、Parquet的元数据在文件末尾，需写完整个文件后才能发送
+        fd, path = tempfile.mkstemp(suffix=f".{cls.FORMATS[export_format][1]}")
+        os.close(fd)
+        try:
+            await cls.write_file(export_type, export_format, chunks, path)
+            read_path = path
+            if cache_path and not state["partial"]:
+                ExportCache.store_file(cache_path, path)
+                read_path = cache_path
+            with open(read_path, "rb") as f:
+                while True:
+                    data = f.read(EXPORT_CONFIG["read_chunk_bytes"])
+                    if not data:
+                        break
+                    yield data
+        finally:
+            if os.path.exists(path):
+                os.remove(path)
+
+    @staticmethod
+    def filename(activity_id: int, export_type: str, extension: str) -> str:
+        return f"activity_{activity_id}_{export_type}.{extension}"
+
+    @staticmethod
+    def content_disposition(filename: str) -> str:
+        return f"attachment; filename=\"{filename}\"; filename*=UTF-8''{quote(filename)}"
+
+    @classmethod
+    def stream(cls, export_type: str, export_format: str, activity_id: int, college_id: Optional[str] = None,
+               start_date: Optional[str] = None, end_date: Optional[str] = None,
+               exact: bool = True, cache_path: Optional[str] = None) -> StreamingResponse:
+        """
+        生成导出文件的流式响应
+
+        Args:
+            export_type: 导出数据类型
+            export_format: 导出格式（csv/excel/parquet/arrow）
+            activity_id: 活动ID
+            college_id: 可选的学院ID
+            start_date: 可选的开始日期，格式YYYY-MM-DD
+            end_date: 可选的结束日期，格式YYYY-MM-DD
+            exact: 是否精确统计投票人数
+            cache_path: 可选的缓存文件路径，生成完成后写入该路径
+
+        Returns:
+            StreamingResponse
+        """
+        cls.check(export_type, export_format, start_date, end_date)
+        media_type, extension = cls.FORMATS[export_format]
+        chunks = cls.iter_chunks(export_type, activity_id, college_id, start_date, end_date, exact)
+        state = {"partial": False}
+        if cache_path:
+            chunks = cls._watch_partial(chunks, state)
+        if export_format in ("csv", "arrow"):
+            if export_format == "csv":
+                body = cls._stream_csv(export_type, chunks)
+            else:
+                body = cls._stream_arrow(export_type, chunks)
+            if cache_path:
+                body = cls._tee_to_cache(body, cache_path, state)
+        else:
+            body = cls._stream_file(export_type, export_format, chunks, cache_path, state)
+        return StreamingResponse(
+            body,
+            media_type=media_type,
+            headers={"Content-Disposition": cls.content_disposition(cls.filename(activity_id, export_type, extension))}
+        )
+
+
+class _ChunkSink:
+    """供pyarrow写入的类文件对象，写入的数据在drain时取出，用于边写边发送"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
@@ -0,0 +1,120 @@
+from typing import Optional, Dict, Any
+import glob
+import hashlib
+import json
+import logging
+import os
+
+from ..auth.service import AuthService
+from ..config import EXPORT_DIR, EXPORT_CACHE_CONFIG
+
+
+class ExportCache:
+    """
+    导出和预览结果缓存
+
+    每个活动有一个数据版本号，选票提交、候选人或活动变更时递增。
+    缓存键包含版本号和筛选条件，版本号变化后旧缓存自然失效；
+    已结束活动的版本号不再变化，缓存可一直复用。
+    JSON结果存放在Redis中（读取时续期），导出文件存放在本地目录。
+    """
+    logger = logging.getLogger('vote_service')
+
+    CACHE_DIR = os.path.join(EXPORT_DIR, "cache")
+
+    @staticmethod
+    def _version_key(activity_id: int) -> str:
+        return f"vote:data_version:{activity_id}"
+
+    @classmethod
+    def version(cls, activity_id: int) -> Optional[int]:
+        """
+        读取活动的数据版本号，需在计算结果之前读取
+
+        Returns:
+            版本号；Redis不可用时返回None，调用方应跳过缓存
+        """
+        try:
+            return int(AuthService.redis_client.get(cls._version_key(activity_id)) or 0)
+        except Exception as e:
+            cls.logger.error(f"读取数据版本号失败: {str(e)}")
+            return None
+
+    @classmethod
+    def bump(cls, *activity_ids: int):
+        """活动数据变化后递增版本号"""
+        if not activity_ids:
+            return
+        try:
+            pipe = AuthService.redis_client.pipeline(transaction=False)
+            for activity_id in set(activity_ids):
+                pipe.incr(cls._version_key(activity_id))
+            pipe.execute()
+        except Exception as e:
+            cls.logger.error(f"递增数据版本号失败: {str(e)}")
+
+    @staticmethod
+    def _digest(params: Dict[str, Any]) -> str:
+        return hashlib.sha1(json.dumps(params, sort_keys=True).encode("utf-8")).hexdigest()
+
+    @classmethod
+    def _key(cls, activity_id: int, version: int, params: Dict[str, Any]) -> str:
+        return f"export_cache:{activity_id}:{version}:{cls._digest(params)}"
+
+    @classmethod
+    def get(cls, activity_id: int, version: Optional[int], params: Dict[str, Any]) -> Optional[Any]:
+        if version is None:
+            return None
+        try:
+            value = AuthService.redis_client.getex(
+                cls._key(activity_id, version, params), ex=EXPORT_CACHE_CONFIG["ttl"]
+            )
+        except Exception as e:
+            cls.logger.error(f"读取导出缓存失败: {str(e)}")
+            return None
+        return json.loads(value) if value is not None else None
+
+    @classmethod
+    def set(cls, activity_id: int, version: Optional[int], params: Dict[str, Any], data: Any):
+        """写入JSON结果，超过max_bytes的结果不缓存"""
+        if version is None:
+            return
+        value = json.dumps(data, ensure_ascii=False, default=str)
+        if len(value) > EXPORT_CACHE_CONFIG["max_bytes"]:
+            return
+        try:
+            AuthService.redis_client.set(
+                cls._key(activity_id, version, params), value, ex=EXPORT_CACHE_CONFIG["ttl"]
+            )
+        except Exception as e:
+            cls.logger.error(f"写入导出缓存失败: {str(e)}")
+
+    @classmethod
+    def file_path(cls, activity_id: int, version: Optional[int], params: Dict[str, Any],
+                  extension: str) -> Optional[str]:
+        """缓存文件路径；Redis不可用时返回None"""
+        if version is None:
+            return None
+        return os.path.join(cls.CACHE_DIR, f"{activity_id}_{version}_{cls._digest(params)}.{extension}")
+
+    @classmethod
+    def store_file(cls, path: str, tmp_path: str):
+        """将生成完成的临时文件放入缓存，并删除同一筛选条件的旧版本文件"""
+        os.makedirs(cls.CACHE_DIR, exist_ok=True)
+        os.replace(tmp_path, path)
+        activity_id, _, rest = os.path.basename(path).split("_", 2)
+        for old_path in glob.glob(os.path.join(cls.CACHE_DIR, f"{activity_id}_*_{rest}")):
+            if old_path != path:
+                try:
+                    os.remove(old_path)
+                except OSError:
+                    pass
+
+    @classmethod
+    def clear_files(cls, activity_id: int):
+        """活动删除后清理其缓存文件"""
+        for path in glob.glob(os.path.join(cls.CACHE_DIR, f"{activity_id}_*")):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
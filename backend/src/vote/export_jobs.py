@@ -0,0 +1,284 @@
+from datetime import datetime, timedelta
+from typing import Optional, List, Dict, Any, AsyncIterator, Set
+import asyncio
+import json
+import logging
+import os
+import uuid
+
+from fastapi import Request
+from sqlalchemy.orm import Session
+
+from ..admin_log.schemas import AdminActionType
+from ..admin_log.service import AdminLogService
+from ..auth.constants import AdminType
+from ..config import EXPORT_DIR, EXPORT_JOB_CONFIG
+from ..database import SessionLocal
+from ..models import ExportJob, VoteActivity
+from .export import VoteExporter
+
+
+class ExportJobService:
+    """
+    后台导出任务
+
+    提交时记录EXPORT操作日志并创建任务记录，由当前worker的后台任务按
+    max_workers 限制并发执行，导出文件写入本地目录，超过保留时间后删除。
+    任务状态和进度保存在数据库中，任一worker都可以查询。
+    """
+    logger = logging.getLogger('vote_service')
+
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    EXPIRED = "expired"
+
+    _semaphore: Optional[asyncio.Semaphore] = None
+    _tasks: Set[asyncio.Task] = set()
+    _cleanup_task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def create(cls, db: Session, request: Request, user_session, activity: VoteActivity, export_type: str,
+               export_format: str, college_id: Optional[str] = None, start_date: Optional[str] = None,
+               end_date: Optional[str] = None, exact: bool = True) -> ExportJob:
+        """
+        记录操作日志并创建导出任务
+
+        Returns:
+            新建的任务记录
+        """
+        VoteExporter.check(export_type, export_format, start_date, end_date)
+        admin_log = AdminLogService.log_admin_action(
+            db=db,
+            request=request,
+            user_session=user_session,
+            action_type=AdminActionType.EXPORT,
+            resource_type=f"activity_{export_type}",
+            resource_id=str(activity.id),
+            description=f"导出活动 {activity.title} 的{export_type}数据（后台任务）"
+        )
+        job = ExportJob(
+            id=uuid.uuid4().hex,
+            admin_log_id=admin_log.id if admin_log else None,
+            admin_id=user_session.staff_id,
+            activity_id=activity.id,
+            export_type=export_type,
+            export_format=export_format,
+            params=json.dumps({
+                "college_id": college_id,
+                "start_date": start_date,
+                "end_date": end_date,
+                "exact": exact
+            }),
+            status=cls.PENDING,
+            processed_rows=0
+        )
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+        return job
+
+    @classmethod
+    def submit(cls, job_id: str):
+        """在当前事件循环中调度任务"""
+        task = asyncio.create_task(cls._run(job_id), name=job_id)
+        cls._tasks.add(task)
+        task.add_done_callback(cls._tasks.discard)
+
+    @staticmethod
+    def can_access(job: ExportJob, user_session) -> bool:
+        """校级管理员可以访问所有任务，其他管理员只能访问自己提交的任务"""
+        return user_session.admin_type == AdminType.school or job.admin_id == user_session.staff_id
+
+    @classmethod
+    def to_progress(cls, job: ExportJob) -> Dict[str, Any]:
+        if job.status == cls.COMPLETED:
+            percent = 100.0
+        elif job.total_rows:
+            percent = round(min(job.processed_rows / job.total_rows, 1.0) * 99, 1)
+        else:
+            percent = 0.0
+        return {
+            "job_id": job.id,
+            "status": job.status,
+            "activity_id": job.activity_id,
+            "export_type": job.export_type,
+            "format": job.export_format,
+            "admin_log_id": job.admin_log_id,
+            "processed_rows": job.processed_rows,
+            "total_rows": job.total_rows,
+            "percent": percent,
+            "error": job.error,
+            "file_size": job.file_size,
+            "created_at": job.created_at,
+            "finished_at": job.finished_at,
+            "expires_at": job.expires_at,
+            "download_url": f"/vote/export/jobs/{job.id}/download" if job.status == cls.COMPLETED else None
+        }
+
+    @classmethod
+    def file_info(cls, job: ExportJob):
+        """
+        获取可下载文件的路径、文件名和Content-Type
+
+        Raises:
+            ValueError: 任务未完成或文件已过期
+        """
+        if job.status != cls.COMPLETED or not job.file_path or not os.path.exists(job.file_path):
+            raise ValueError("导出文件不存在或已过期")
+        media_type, extension = VoteExporter.FORMATS[job.export_format]
+        return job.file_path, VoteExporter.filename(job.activity_id, job.export_type, extension), media_type
+
+    @staticmethod
+    def _update(job_id: str, **values):
+        db = SessionLocal()
+        try:
+            db.query(ExportJob).filter(ExportJob.id == job_id).update(values)
+            db.commit()
+        finally:
+            db.close()
+
+    @staticmethod
+    def _load(job_id: str) -> Optional[ExportJob]:
+        db = SessionLocal()
+        try:
+            job = db.query(ExportJob).filter(ExportJob.id == job_id).first()
+            if job:
+                db.expunge(job)
+            return job
+        finally:
+            db.close()
+
+    @classmethod
+    async def _track(cls, job_id: str, chunks: AsyncIterator[List[Dict[str, Any]]]) -> AsyncIterator[List[Dict[str, Any]]]:
+        """透传导出记录，每块写出后更新进度"""
+        processed = 0
+        async for records in chunks:
+            yield records
+            processed += len(records)
+            await asyncio.to_thread(cls._update, job_id, processed_rows=processed)
+
+    @classmethod
+    def _get_semaphore(cls) -> asyncio.Semaphore:
+        if cls._semaphore is None:
+            cls._semaphore = asyncio.Semaphore(EXPORT_JOB_CONFIG["max_workers"])
+        return cls._semaphore
+
+    @classmethod
+    async def _run(cls, job_id: str):
+        async with cls._get_semaphore():
+            job = await asyncio.to_thread(cls._load, job_id)
+            if job is None or job.status != cls.PENDING:
+                return
+            params = json.loads(job.params)
+            _, extension = VoteExporter.FORMATS[job.export_format]
+            path = os.path.join(EXPORT_DIR, f"{job.id}.{extension}")
+            try:
+                total_rows = await asyncio.to_thread(
+                    VoteExporter.count_rows, job.export_type, job.activity_id,
+                    params["college_id"], params["start_date"], params["end_date"]
+                )
+                await asyncio.to_thread(
+                    cls._update, job_id, status=cls.RUNNING, started_at=datetime.now(), total_rows=total_rows
+                )
+                chunks = VoteExporter.iter_chunks(
+                    job.export_type, job.activity_id, params["college_id"],
+                    params["start_date"], params["end_date"], params["exact"]
+                )
+                await VoteExporter.write_file(job.export_type, job.export_format, cls._track(job_id, chunks), path)
+                finished_at = datetime.now()
+                await asyncio.to_thread(
+                    cls._update, job_id,
+                    status=cls.COMPLETED,
+                    total_rows=ExportJob.processed_rows if total_rows is None else total_rows,
+                    file_path=path,
+                    file_size=os.path.getsize(path),
+                    finished_at=finished_at,
+                    expires_at=finished_at + timedelta(hours=EXPORT_JOB_CONFIG["retention_hours"])
+                )
+                cls.logger.info(f"导出任务 {job_id} 完成")
+            except asyncio.CancelledError:
+                # 服务关闭，直接同步标记，避免再次等待
+                if os.path.exists(path):
+                    os.remove(path)
+                cls._update(job_id, status=cls.FAILED, error="服务关闭导致任务中断", finished_at=datetime.now())
+                raise
+            except Exception as e:
+                cls.logger.error(f"导出任务 {job_id} 失败: {str(e)}")
+                if os.path.exists(path):
+                    os.remove(path)
+                await asyncio.to_thread(
+                    cls._update, job_id, status=cls.FAILED, error=str(e), finished_at=datetime.now()
+                )
+
+    @classmethod
+    def cleanup(cls, live_job_ids: Optional[Set[str]] = None) -> int:
+        """
+        删除过期的导出文件，并将超时未结束的任务标记为失败
+
+        Args:
+            live_job_ids: 当前worker中仍在执行或排队的任务ID，不会被标记为失败
+
+        Returns:
+            删除的文件数
+        """
+        now = datetime.now()
+        db = SessionLocal()
+        try:
+            expired = db.query(ExportJob).filter(
+                ExportJob.status == cls.COMPLETED,
+                ExportJob.expires_at < now
+            ).all()
+            for job in expired:
+                if job.file_path and os.path.exists(job.file_path):
+                    os.remove(job.file_path)
+                job.status = cls.EXPIRED
+                job.file_path = None
+
+            # 执行中的worker重启后任务不会恢复；执行中的任务每写出一块都会更新updated_at
+            stale = db.query(ExportJob).filter(
+                ExportJob.status.in_([cls.PENDING, cls.RUNNING]),
+                ExportJob.updated_at < now - timedelta(seconds=EXPORT_JOB_CONFIG["job_timeout"])
+            )
+            if live_job_ids:
+                stale = stale.filter(ExportJob.id.notin_(live_job_ids))
+            stale.update({"status": cls.FAILED, "error": "任务超时或服务重启导致中断", "finished_at": now},
+                         synchronize_session=False)
+            db.commit()
+            if expired:
+                cls.logger.info(f"已清理 {len(expired)} 个过期导出文件")
+            return len(expired)
+        finally:
+            db.close()
+
+    @classmethod
+    async def _run_cleanup(cls):
+        while True:
+            try:
+                live_job_ids = {task.get_name() for task in cls._tasks if not task.done()}
+                await asyncio.to_thread(cls.cleanup, live_job_ids)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                cls.logger.error(f"清理导出文件失败: {str(e)}")
+            try:
+                await asyncio.sleep(EXPORT_JOB_CONFIG["cleanup_interval"])
+            except asyncio.CancelledError:
+                break
+
+    @classmethod
+    def start(cls):
+        """启动过期文件清理任务，需在事件循环中调用"""
+        if cls._cleanup_task is None or cls._cleanup_task.done():
+            cls._cleanup_task = asyncio.create_task(cls._run_cleanup())
+
+    @classmethod
+    async def stop(cls):
+        tasks = list(cls._tasks)
+        if cls._cleanup_task is not None:
+            tasks.append(cls._cleanup_task)
+            cls._cleanup_task = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
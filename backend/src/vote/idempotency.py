@@ -0,0 +1,146 @@
+from contextlib import contextmanager
+from typing import Optional, Dict, Any, Tuple
+import hashlib
+import json
+import logging
+import threading
+import uuid
+
+import redis
+
+from ..auth.service import AuthService
+from ..config import IDEMPOTENCY_CONFIG
+
+
+class IdempotencyStore:
+    """
+    投票请求幂等键存储
+
+    首次请求先以SET NX占位（占位中带有本次请求的随机token），处理期间由后台线程
+    定期续期占位，处理完成后只在占位仍属于本次请求时保存响应状态码和内容；
+    携带相同 Idempotency-Key 的重试请求直接从Redis返回原结果，
+    不再访问数据库。
+    """
+    logger = logging.getLogger('vote_service')
+
+    PROCESSING = "processing"
+
+    # 占位属于本次请求时续期/写入结果/删除；KEYS[1]: 幂等键, ARGV[1]: token
+    _OWNED = """
+    local value = redis.call('GET', KEYS[1])
+    if not value or cjson.decode(value)['token'] ~= ARGV[1] then
+        return 0
+    end
+    """
+    _RENEW_SCRIPT = _OWNED + "return redis.call('EXPIRE', KEYS[1], ARGV[2])"
+    _COMPLETE_SCRIPT = _OWNED + "redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3]) return 1"
+    _ABANDON_SCRIPT = _OWNED + "return redis.call('DEL', KEYS[1])"
+    _scripts: Dict[str, Any] = {}
+
+    @staticmethod
+    def _key(voter_id: str, idempotency_key: str) -> str:
+        return f"idem:ballot:{voter_id}:{idempotency_key}"
+
+    @classmethod
+    def _script(cls, name: str):
+        if name not in cls._scripts:
+            cls._scripts[name] = AuthService.redis_client.register_script(getattr(cls, name))
+        return cls._scripts[name]
+
+    @staticmethod
+    def fingerprint(activity_id: int, candidate_ids) -> str:
+        """请求内容指纹，用于识别同一个键被用于不同的选票"""
+        payload = f"{activity_id}:{','.join(str(cid) for cid in sorted(candidate_ids))}"
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    @classmethod
+    def begin(cls, voter_id: str, idempotency_key: str, fingerprint: str) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """
+        开始处理一个带幂等键的请求
+
+        Returns:
+            (已保存的结果, token)：结果包含status_code和body；结果为None表示这是首次请求，
+            应继续处理并在 complete/abandon 时传入token（Redis不可用时token为None）
+
+        Raises:
+            ValueError: 同一个键的请求仍在处理中，或该键已用于不同的选票
+        """
+        key = cls._key(voter_id, idempotency_key)
+        token = uuid.uuid4().hex
+        placeholder = json.dumps({"state": cls.PROCESSING, "fingerprint": fingerprint, "token": token})
+        try:
+            if AuthService.redis_client.set(key, placeholder, nx=True, ex=IDEMPOTENCY_CONFIG["lock_ttl"]):
+                return None, token
+            stored = AuthService.redis_client.get(key)
+        except redis.RedisError as e:
+            # Redis不可用时按普通请求处理，重复投票仍由投票人集合和唯一约束拦截
+            cls.logger.error(f"读取幂等键失败: {str(e)}")
+            return None, None
+
+        if stored is None:
+            # 占位恰好过期，按首次请求处理
+            return cls.begin(voter_id, idempotency_key, fingerprint)
+        record = json.loads(stored)
+        if record["fingerprint"] != fingerprint:
+            raise ValueError("该Idempotency-Key已用于其他投票请求")
+        if record["state"] == cls.PROCESSING:
+            raise ValueError("相同的投票请求正在处理中，请稍后重试")
+        return record, None
+
+    @classmethod
+    @contextmanager
+    def hold(cls, voter_id: str, idempotency_key: str, token: Optional[str]):
+        """处理请求期间每隔lock_ttl的三分之一续期一次占位，处理时间超过lock_ttl时重试请求仍会收到409"""
+        if token is None:
+            yield
+            return
+        stop = threading.Event()
+        key = cls._key(voter_id, idempotency_key)
+        ttl = IDEMPOTENCY_CONFIG["lock_ttl"]
+
+        def renew():
+            while not stop.wait(ttl / 3):
+                try:
+                    if not cls._script("_RENEW_SCRIPT")(keys=[key], args=[token, ttl]):
+                        return
+                except Exception as e:
+                    cls.logger.error(f"续期幂等占位失败: {str(e)}")
+
+        thread = threading.Thread(target=renew, name="idempotency-renew", daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stop.set()
+
+    @classmethod
+    def complete(cls, voter_id: str, idempotency_key: str, fingerprint: str, token: Optional[str],
+                 status_code: int, body: Any):
+        """
+        保存请求结果供重试请求复用，占位已不属于本次请求时不覆盖
+
+        只应保存成功结果和重试也不会改变的业务错误（如已投过票）；
+        活动尚未开始等暂时性错误应调用 abandon，使客户端稍后可以用同一个键重试
+        """
+        if token is None:
+            return
+        record = {"state": "done", "fingerprint": fingerprint, "token": token, "status_code": status_code, "body": body}
+        try:
+            stored = cls._script("_COMPLETE_SCRIPT")(
+                keys=[cls._key(voter_id, idempotency_key)],
+                args=[token, json.dumps(record, ensure_ascii=False), IDEMPOTENCY_CONFIG["result_ttl"]]
+            )
+            if not stored:
+                cls.logger.warning(f"幂等占位已过期或被其他请求占用，未保存结果: {idempotency_key}")
+        except Exception as e:
+            cls.logger.error(f"保存幂等结果失败: {str(e)}")
+
+    @classmethod
+    def abandon(cls, voter_id: str, idempotency_key: str, token: Optional[str]):
+        """请求异常中断时删除本次请求的占位，允许客户端重试"""
+        if token is None:
+            return
+        try:
+            cls._script("_ABANDON_SCRIPT")(keys=[cls._key(voter_id, idempotency_key)], args=[token])
+        except Exception as e:
+            cls.logger.error(f"删除幂等占位失败: {str(e)}")
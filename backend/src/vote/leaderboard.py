@@ -0,0 +1,145 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import func, and_
+from typing import Optional, List, Dict, Any
+import logging
+
+from ..auth.service import AuthService
+from ..models import Candidate, Vote, ActivityCandidateAssociation
+from .rebuild_guard import RebuildGuard
+
+
+class Leaderboard:
+    """
+    每个活动的得票排行榜（Redis有序集合）
+
+    全体排行榜 vote:lb:{activity_id}，按学院的排行榜 vote:lb:{activity_id}:college:{college_id}，
+    候选人所属学院记录在 vote:lb:{activity_id}:colleges。选票提交后通过Lua脚本
+    原子地同时更新全体和学院排行榜并递增写入序号，排名查询为O(log n)；
+    重建通过写入序号与并发的增量更新互斥（见RebuildGuard）。
+    """
+    logger = logging.getLogger('vote_service')
+
+    # KEYS[1]: 全体排行榜, KEYS[2]: 候选人学院映射, KEYS[3]: 写入序号; ARGV[1]: 学院排行榜key前缀, ARGV[2..]: 候选人ID
+    _INCR_SCRIPT = """
+    for i = 2, #ARGV do
+        local cid = ARGV[i]
+        redis.call('ZINCRBY', KEYS[1], 1, cid)
+        local college_id = redis.call('HGET', KEYS[2], cid)
+        if college_id then
+            redis.call('ZINCRBY', ARGV[1] .. college_id, 1, cid)
+        end
+    end
+    redis.call('INCR', KEYS[3])
+    return #ARGV - 1
+    """
+    _incr = None
+
+    @staticmethod
+    def _key(activity_id: int, college_id: Optional[str] = None) -> str:
+        if college_id and college_id != 'all':
+            return f"vote:lb:{activity_id}:college:{college_id}"
+        return f"vote:lb:{activity_id}"
+
+    @staticmethod
+    def _colleges_key(activity_id: int) -> str:
+        return f"vote:lb:{activity_id}:colleges"
+
+    @staticmethod
+    def _ready_key(activity_id: int) -> str:
+        return f"vote:lb:{activity_id}:ready"
+
+    @staticmethod
+    def _seq_key(activity_id: int) -> str:
+        return f"vote:lb:{activity_id}:seq"
+
+    @classmethod
+    def record_ballots(cls, ballots: List[Dict[str, Any]]):
+        """
+        选票提交后增加排行榜分数
+
+        Args:
+            ballots: 已提交的选票列表，每项包含activity_id和candidate_ids
+        """
+        if cls._incr is None:
+            cls._incr = AuthService.redis_client.register_script(cls._INCR_SCRIPT)
+        pipe = AuthService.redis_client.pipeline(transaction=False)
+        for ballot in ballots:
+            activity_id = ballot["activity_id"]
+            cls._incr(
+                keys=[cls._key(activity_id), cls._colleges_key(activity_id), cls._seq_key(activity_id)],
+                args=[f"vote:lb:{activity_id}:college:", *ballot["candidate_ids"]],
+                client=pipe
+            )
+        pipe.execute()
+
+    @classmethod
+    def rebuild(cls, db: Session, activity_id: int):
+        """从votes表重建活动的排行榜，包括尚无得票的候选人"""
+        def load():
+            return db.query(
+                Candidate.id,
+                Candidate.college_id,
+                func.count(Vote.id)
+            ).join(
+                ActivityCandidateAssociation, and_(
+                    ActivityCandidateAssociation.candidate_id == Candidate.id,
+                    ActivityCandidateAssociation.activity_id == activity_id
+                )
+            ).outerjoin(
+                Vote, and_(
+                    Vote.candidate_id == Candidate.id,
+                    Vote.activity_id == activity_id
+                )
+            ).group_by(
+                Candidate.id
+            ).all()
+
+        client = AuthService.redis_client
+        stale_keys = list(client.scan_iter(match=f"vote:lb:{activity_id}:college:*", count=1000))
+
+        def write(pipe, rows):
+            pipe.delete(cls._key(activity_id), cls._colleges_key(activity_id), *stale_keys)
+            for candidate_id, college_id, vote_count in rows:
+                pipe.zadd(cls._key(activity_id), {candidate_id: vote_count})
+                pipe.zadd(cls._key(activity_id, college_id), {candidate_id: vote_count})
+                pipe.hset(cls._colleges_key(activity_id), candidate_id, college_id)
+            pipe.set(cls._ready_key(activity_id), 1)
+
+        RebuildGuard.run(db, cls._seq_key(activity_id), load, write)
+
+    @classmethod
+    def _ensure_loaded(cls, db: Session, activity_id: int):
+        if not AuthService.redis_client.exists(cls._ready_key(activity_id)):
+            cls.rebuild(db, activity_id)
+
+    @classmethod
+    def top(cls, db: Session, activity_id: int, limit: int = 10, college_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        获取得票前N名
+
+        Returns:
+            按得票数降序排列的列表，每项包含rank、candidate_id和vote_count
+        """
+        cls._ensure_loaded(db, activity_id)
+        entries = AuthService.redis_client.zrevrange(cls._key(activity_id, college_id), 0, limit - 1, withscores=True)
+        return [
+            {"rank": rank, "candidate_id": int(candidate_id), "vote_count": int(score)}
+            for rank, (candidate_id, score) in enumerate(entries, 1)
+        ]
+
+    @classmethod
+    def rank(cls, db: Session, activity_id: int, candidate_id: int, college_id: Optional[str] = None) -> Optional[int]:
+        """获取候选人的名次（从1开始），候选人不在排行榜中时返回None"""
+        cls._ensure_loaded(db, activity_id)
+        rank = AuthService.redis_client.zrevrank(cls._key(activity_id, college_id), candidate_id)
+        return rank + 1 if rank is not None else None
+
+    @classmethod
+    def clear(cls, activity_id: int):
+        try:
+            client = AuthService.redis_client
+            college_keys = list(client.scan_iter(match=f"vote:lb:{activity_id}:college:*", count=1000))
+            client.delete(cls._key(activity_id), cls._colleges_key(activity_id), cls._ready_key(activity_id),
+                          cls._seq_key(activity_id), *college_keys)
+        except Exception as e:
+            cls.logger.error(f"清理排行榜失败: {str(e)}")
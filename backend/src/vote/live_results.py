@@ -0,0 +1,147 @@
+from typing import Optional, List, Dict, Any, Set, Tuple
+import asyncio
+import json
+import logging
+import time
+
+from ..auth.service import AuthService
+from ..config import TALLY_CONFIG, LIVE_RESULTS_CONFIG
+from ..database import SessionLocal
+from .service import VoteService
+
+
+class LiveResultsBroadcaster:
+    """
+    实时结果推送
+
+    每个worker只运行一个生产者任务：收到计票更新通知（Redis pub/sub）
+    或到达兜底刷新时间后计算一次结果，把变化的候选人票数推送给所有
+    SSE连接。数据库负载与在线观看人数无关。
+    """
+    logger = logging.getLogger('vote_service')
+
+    _subscribers: Set[asyncio.Queue] = set()
+    _producer: Optional[asyncio.Task] = None
+    _activity_id: Optional[int] = None
+    _statistics: List[Dict[str, Any]] = []
+    _loaded = False  # 是否已成功计算过结果
+
+    @staticmethod
+    def _event(name: str, payload: Dict[str, Any]) -> str:
+        return f"event: {name}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+    @classmethod
+    def _snapshot_event(cls) -> str:
+        return cls._event("snapshot", {"activity_id": cls._activity_id, "statistics": cls._statistics})
+
+    @staticmethod
+    def _compute() -> Tuple[Optional[int], List[Dict[str, Any]]]:
+        db = SessionLocal()
+        try:
+            activity_id = VoteService.get_active_activity_id(db)
+            if activity_id is None:
+                return None, []
+            return activity_id, VoteService.get_live_vote_statistics(db, activity_id)
+        finally:
+            db.close()
+
+    @classmethod
+    def _publish(cls, event: str):
+        for queue in list(cls._subscribers):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # 客户端消费过慢，丢弃积压事件，改为发送完整快照
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(cls._snapshot_event())
+
+    @classmethod
+    async def _refresh(cls):
+        activity_id, statistics = await asyncio.to_thread(cls._compute)
+        if activity_id != cls._activity_id or not cls._loaded:
+            cls._activity_id, cls._statistics = activity_id, statistics
+            cls._loaded = True
+            cls._publish(cls._snapshot_event())
+            return
+
+        previous = {item["candidate_id"]: item["vote_count"] for item in cls._statistics}
+        changes = [
+            {"candidate_id": item["candidate_id"], "vote_count": item["vote_count"]}
+            for item in statistics
+            if previous.get(item["candidate_id"]) != item["vote_count"]
+        ]
+        cls._statistics = statistics
+        if changes:
+            cls._publish(cls._event("delta", {"activity_id": activity_id, "changes": changes}))
+
+    @staticmethod
+    def _drain(pubsub) -> bool:
+        """读取并丢弃pub/sub中积压的通知，返回是否收到过通知"""
+        received = False
+        message = pubsub.get_message(ignore_subscribe_messages=True, timeout=LIVE_RESULTS_CONFIG["tick_seconds"])
+        while message:
+            received = True
+            message = pubsub.get_message(ignore_subscribe_messages=True, timeout=0)
+        return received
+
+    @classmethod
+    async def _run(cls):
+        pubsub = None
+        last_refresh = 0.0
+        while True:
+            try:
+                if pubsub is None:
+                    pubsub = AuthService.redis_client.pubsub()
+                    pubsub.subscribe(TALLY_CONFIG["update_channel"])
+                notified = await asyncio.to_thread(cls._drain, pubsub)
+                stale = time.monotonic() - last_refresh >= LIVE_RESULTS_CONFIG["full_refresh_seconds"]
+                if cls._subscribers and (notified or stale):
+                    await cls._refresh()
+                    last_refresh = time.monotonic()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                cls.logger.error(f"实时结果推送刷新失败: {str(e)}")
+                if pubsub is not None:
+                    pubsub.close()
+                    pubsub = None
+                await asyncio.sleep(LIVE_RESULTS_CONFIG["tick_seconds"])
+        if pubsub is not None:
+            pubsub.close()
+
+    @classmethod
+    async def subscribe(cls) -> asyncio.Queue:
+        """
+        注册一个SSE连接，首个事件为当前结果的完整快照
+
+        首次计算失败时先发送error事件并保持连接，生产者任务重试成功后推送快照
+        """
+        if cls._producer is None or cls._producer.done():
+            cls._producer = asyncio.create_task(cls._run())
+            try:
+                await cls._refresh()
+            except Exception as e:
+                cls.logger.error(f"实时结果首次计算失败，等待后台重试: {str(e)}")
+        queue = asyncio.Queue(maxsize=LIVE_RESULTS_CONFIG["queue_size"])
+        if cls._loaded:
+            queue.put_nowait(cls._snapshot_event())
+        else:
+            queue.put_nowait(cls._event("error", {"detail": "实时结果暂时不可用，正在重试"}))
+        cls._subscribers.add(queue)
+        return queue
+
+    @classmethod
+    def unsubscribe(cls, queue: asyncio.Queue):
+        cls._subscribers.discard(queue)
+
+    @classmethod
+    async def stop(cls):
+        if cls._producer is None:
+            return
+        cls._producer.cancel()
+        try:
+            await cls._producer
+        except asyncio.CancelledError:
+            pass
+        cls._producer = None
@@ -0,0 +1,55 @@
+from sqlalchemy.orm import Session
+from typing import Optional, Callable, Any
+import logging
+
+import redis
+
+from ..auth.service import AuthService
+
+
+class RebuildGuard:
+    """
+    从votes表重建Redis计数时防止覆盖并发的增量更新
+
+    增量写入（HINCRBY/ZINCRBY）在同一管道中递增写入序号 seq_key。重建时先读取序号再查询，
+    然后WATCH序号，在MULTI中删除并写入新数据；查询期间有增量写入时序号变化，
+    事务放弃并重新查询，避免增量丢失或被重复计入。
+    """
+    logger = logging.getLogger('vote_service')
+
+    MAX_ATTEMPTS = 3
+
+    @classmethod
+    def run(cls, db: Session, seq_key: str, load: Callable[[], Any],
+            write: Callable[[Any, Any], None]) -> Optional[Any]:
+        """
+        执行带写入序号检查的重建
+
+        Args:
+            db: 数据库会话
+            seq_key: 增量写入递增的序号key
+            load: 从数据库查询重建数据
+            write: 在事务管道中写入重建数据，参数为(pipe, data)
+
+        Returns:
+            写入成功时返回查询结果，重试后仍有并发写入时返回None（保留现有计数）
+        """
+        client = AuthService.redis_client
+        for _ in range(cls.MAX_ATTEMPTS):
+            seq = client.get(seq_key)
+            # 结束当前事务，使查询读取最新快照（包含seq读取之前已提交的选票）
+            db.commit()
+            data = load()
+            with client.pipeline(transaction=True) as pipe:
+                try:
+                    pipe.watch(seq_key)
+                    if pipe.get(seq_key) != seq:
+                        continue
+                    pipe.multi()
+                    write(pipe, data)
+                    pipe.execute()
+                    return data
+                except redis.WatchError:
+                    continue
+        cls.logger.warning(f"重建期间持续有选票写入，跳过本次重建: {seq_key}")
+        return None
@@ -0,0 +1,84 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import func, select
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from datetime import datetime
+from typing import List, Dict, Any, Tuple
+import logging
+
+from ..models import Vote, VoteActivity, VoteMinuteBucket
+
+
+class VoteRollup:
+    """
+    按分钟预聚合的得票数（vote_minute_buckets）
+
+    选票写入时在同一事务中按 (活动, 候选人, 分钟) 累加，
+    时间范围统计和趋势图直接读取预聚合结果，不再扫描votes表。
+    """
+    logger = logging.getLogger('vote_service')
+
+    @staticmethod
+    def bucket_of(created_at: datetime) -> datetime:
+        return created_at.replace(second=0, microsecond=0)
+
+    @classmethod
+    def apply(cls, db: Session, vote_rows: List[Dict[str, Any]]):
+        """
+        在当前事务中累加预聚合计数，由调用方提交
+
+        Args:
+            db: 数据库会话
+            vote_rows: 本次写入的投票行，需包含activity_id、candidate_id和created_at
+        """
+        counts: Dict[Tuple[int, int, datetime], int] = {}
+        for row in vote_rows:
+            key = (row["activity_id"], row["candidate_id"], cls.bucket_of(row["created_at"]))
+            counts[key] = counts.get(key, 0) + 1
+        if not counts:
+            return
+
+        stmt = mysql_insert(VoteMinuteBucket).values([
+            {"activity_id": activity_id, "candidate_id": candidate_id, "bucket_start": bucket_start, "vote_count": count}
+            for (activity_id, candidate_id, bucket_start), count in counts.items()
+        ])
+        db.execute(stmt.on_duplicate_key_update(
+            vote_count=VoteMinuteBucket.vote_count + stmt.inserted.vote_count
+        ))
+
+    @classmethod
+    def rebuild(cls, db: Session, activity_id: int):
+        """从votes表重建活动的预聚合数据"""
+        bucket = func.date_format(Vote.created_at, '%Y-%m-%d %H:%i:00')
+        db.query(VoteMinuteBucket).filter(VoteMinuteBucket.activity_id == activity_id).delete()
+        db.execute(mysql_insert(VoteMinuteBucket).from_select(
+            ["activity_id", "candidate_id", "bucket_start", "vote_count"],
+            select(
+                Vote.activity_id,
+                Vote.candidate_id,
+                bucket,
+                func.count(Vote.id)
+            ).where(
+                Vote.activity_id == activity_id
+            ).group_by(
+                Vote.activity_id,
+                Vote.candidate_id,
+                bucket
+            )
+        ))
+        db.commit()
+        cls.logger.info(f"已重建活动 {activity_id} 的分钟级预聚合数据")
+
+    @classmethod
+    def backfill_missing(cls, db: Session) -> List[int]:
+        """为有投票记录但还没有预聚合数据的活动补建（升级后首次启动时）"""
+        activity_ids = [
+            activity_id for (activity_id,) in db.query(VoteActivity.id).filter(
+                db.query(Vote.id).filter(Vote.activity_id == VoteActivity.id).exists(),
+                ~db.query(VoteMinuteBucket.activity_id).filter(
+                    VoteMinuteBucket.activity_id == VoteActivity.id
+                ).exists()
+            )
+        ]
+        for activity_id in activity_ids:
+            cls.rebuild(db, activity_id)
+        return activity_ids
@@ -1,23 +1,35 @@
-from fastapi import APIRouter, HTTPException, Depends, Query, Request, File, UploadFile, status
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response, File, UploadFile, Header, status
 from sqlalchemy.orm import Session
 from typing import List, Optional
 import httpx
 import json
 import os
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.responses import JSONResponse, StreamingResponse, FileResponse
 import shutil
 from pathlib import Path
 from datetime import datetime
 import uuid
+import asyncio
 
 from .schemas import CandidateCreate, CandidateResponse, VoteRecord, ActivityCreate, ActivityResponse, ActiveVoteStatistics, VoteTrendResponse, TotalVoteStats
-from .service import VoteService
+from .service import VoteService, BallotRejectedError
+from .ballot_queue import BallotQueue
+from .voter_registry import VoterRegistry
+from .idempotency import IdempotencyStore
+from .tally import TallyStore
+from .leaderboard import Leaderboard
+from .live_results import LiveResultsBroadcaster
+from .colleges import CollegeCatalog
+from .export import VoteExporter
+from .export_jobs import ExportJobService
+from .export_cache import ExportCache
+from .activity_cache import ActivityCache
 from ..database import get_db
 from ..auth.dependencies import check_roles
 from ..auth.service import AuthService
 from ..auth.constants import AdminType, UserRole
-from ..models import Vote, VoteActivity, Candidate
-from ..config import IMAGES_DIR, IMAGE_CONFIG, BASE_URL
+from ..models import Vote, VoteActivity, Candidate, ExportJob
+from ..config import IMAGES_DIR, IMAGE_CONFIG, BASE_URL, LIVE_RESULTS_CONFIG, ACTIVITY_CACHE_CONFIG, COLLEGE_CONFIG
 from ..admin_log.service import AdminLogService
 from ..admin_log.schemas import AdminActionType
 
@@ -28,11 +40,80 @@ def get_active_activities_statistics(
     db: Session = Depends(get_db)
     # 无权限要求
 ):
-    activities = VoteService.get_active_activities(db)
-    if not activities:
+    activity_id = VoteService.get_active_activity_id(db)
+    if activity_id is None:
         return []
-    print(activities[0])
-    return VoteService.get_activity_vote_statistics(db, activity_id=activities[0]["id"])
+    return VoteService.get_live_vote_statistics(db, activity_id)
+
+@router.get("/active-statistics/stream")
+async def stream_active_statistics(
+    request: Request
+    # 无权限要求
+):
+    """以Server-Sent Events推送当前活动的实时得票，首个事件为完整快照，之后只推送变化"""
+    queue = await LiveResultsBroadcaster.subscribe()
+
+    async def event_stream():
+        try:
+            while not await request.is_disconnected():
+                try:
+                    yield await asyncio.wait_for(queue.get(), timeout=LIVE_RESULTS_CONFIG["keepalive_seconds"])
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+        finally:
+            LiveResultsBroadcaster.unsubscribe(queue)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/leaderboard/{activity_id}")
+def get_leaderboard(
+    activity_id: int,
+    limit: int = Query(10, ge=1, le=200, description="返回前N名"),
+    college_id: Optional[str] = Query(None, description="按候选人学院筛选"),
+    db: Session = Depends(get_db)
+    # 无权限要求
+):
+    """获取活动得票前N名，可按学院筛选"""
+    if ActivityCache.get(db, activity_id) is None:
+        raise HTTPException(status_code=404, detail="活动不存在")
+    entries = Leaderboard.top(db, activity_id, limit, college_id)
+    names = dict(db.query(Candidate.id, Candidate.name).filter(
+        Candidate.id.in_([entry["candidate_id"] for entry in entries])
+    ).all()) if entries else {}
+    for entry in entries:
+        entry["name"] = names.get(entry["candidate_id"], "")
+    return entries
+
+@router.get("/leaderboard/{activity_id}/rank/{candidate_id}")
+def get_candidate_rank(
+    activity_id: int,
+    candidate_id: int,
+    college_id: Optional[str] = Query(None, description="在学院排行榜中的名次"),
+    db: Session = Depends(get_db)
+    # 无权限要求
+):
+    """获取候选人在活动中的名次"""
+    if ActivityCache.get(db, activity_id) is None:
+        raise HTTPException(status_code=404, detail="活动不存在")
+    rank = Leaderboard.rank(db, activity_id, candidate_id, college_id)
+    if rank is None:
+        raise HTTPException(status_code=404, detail="候选人不在该活动的排行榜中")
+    return {"activity_id": activity_id, "candidate_id": candidate_id, "college_id": college_id, "rank": rank}
+
+@router.post("/tallies/{activity_id}/reconcile")
+def reconcile_activity_tally(
+    activity_id: int,
+    db: Session = Depends(get_db),
+    _= Depends(check_roles(allowed_admin_types=[AdminType.school]))
+):
+    """从votes表重建活动的实时计票和排行榜"""
+    counts = TallyStore.rebuild(db, activity_id)
+    Leaderboard.rebuild(db, activity_id)
+    return {"activity_id": activity_id, "candidates": len(counts), "total_votes": sum(counts.values())}
 
 @router.post("/candidates/", response_model=CandidateResponse)
 def create_user(
@@ -63,16 +144,7 @@ def create_user(
             description=f"创建候选人 {db_user.name}，学院: {db_user.college_name}"
         )
         
-        vote_count = db.query(Vote).filter(Vote.candidate_id == db_user.id).count()
-        return CandidateResponse(
-            id=db_user.id,
-            name=db_user.name,
-            college_id=db_user.college_id,
-            photo=db_user.photo,
-            bio=db_user.bio,
-            college_name=db_user.college_name,
-            vote_count=vote_count
-        )
+        return VoteService.to_candidate_responses(db, [db_user])[0]
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -84,43 +156,74 @@ def get_candidates_batch(
 ):
     """Batch retrieve candidate details by IDs"""
     candidates = VoteService.get_candidates(db, candidate_ids=candidate_ids)
-    candidate_responses = []
-    for candidate in candidates:
-        vote_count = db.query(Vote).filter(Vote.candidate_id == candidate.id).count()
-        candidate_responses.append(CandidateResponse(
-            id=candidate.id,
-            name=candidate.name,
-            college_id=candidate.college_id,
-            photo=candidate.photo,
-            bio=candidate.bio,
-            college_name=candidate.college_name,
-            vote_count=vote_count
-        ))
-    return candidate_responses
+    return VoteService.to_candidate_responses(db, candidates)
+
+def _submit_ballot(db: Session, candidate_ids: List[int], voter_id: str, activity_id: int) -> dict:
+    if BallotQueue.enabled():
+        # 队列模式：校验并占位后写入Redis立即返回，由后台线程批量落库
+        VoteService.check_ballot(db, candidate_ids, voter_id, activity_id)
+        VoteService.claim_voter(db, activity_id, voter_id)
+        try:
+            BallotQueue.enqueue(voter_id, activity_id, candidate_ids)
+        except Exception:
+            VoterRegistry.release(activity_id, voter_id)
+            raise
+        return {"success_count": len(candidate_ids), "errors": [], "queued": True}
+
+    results = VoteService.create_bulk_votes(db, candidate_ids, voter_id, activity_id)
+    return {"success_count": results['success_count'], "errors": results['errors']}
 
 @router.post("/vote/batch")
 def create_bulk_votes(
     request: Request,
     candidate_ids: List[int] = Query(..., title="候选ID列表", example=[1,2,3]),
     activity_id: int = Query(..., title="活动ID"),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=128),
     db: Session = Depends(get_db),
     user_session = Depends(check_roles(allowed_roles=[UserRole.graduate, UserRole.phd]))  # 所有登录的人
 ):
-    try:
-        voter_id = user_session.staff_id
+    voter_id = user_session.staff_id
+    if not idempotency_key:
+        try:
+            return _submit_ballot(db, candidate_ids, voter_id, activity_id)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
-        # Check existing votes
-        existing_votes = db.query(Vote).filter(
-            Vote.voter_id == voter_id,
-            Vote.activity_id == activity_id
-        ).count()
-        if existing_votes > 0:
-            raise HTTPException(status_code=400, detail="用户已在该活动中投过票")
+    # 带幂等键的请求：重试直接返回首次请求的结果
+    fingerprint = IdempotencyStore.fingerprint(activity_id, candidate_ids)
+    try:
+        stored, token = IdempotencyStore.begin(voter_id, idempotency_key, fingerprint)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if stored:
+        return JSONResponse(
+            status_code=stored["status_code"],
+            content=stored["body"],
+            headers={"Idempotent-Replayed": "true"}
+        )
 
-        results = VoteService.create_bulk_votes(db, candidate_ids, voter_id, activity_id)
-        return {"success_count": results['success_count'], "errors": results['errors']}
+    try:
+        with IdempotencyStore.hold(voter_id, idempotency_key, token):
+            result = _submit_ballot(db, candidate_ids, voter_id, activity_id)
+    except BallotRejectedError as e:
+        IdempotencyStore.complete(voter_id, idempotency_key, fingerprint, token, 400, {"detail": str(e)})
+        raise HTTPException(status_code=400, detail=str(e))
     except ValueError as e:
+        # 暂时性错误不保存结果，允许用同一个键重试
+        IdempotencyStore.abandon(voter_id, idempotency_key, token)
         raise HTTPException(status_code=400, detail=str(e))
+    except Exception:
+        IdempotencyStore.abandon(voter_id, idempotency_key, token)
+        raise
+    IdempotencyStore.complete(voter_id, idempotency_key, fingerprint, token, 200, result)
+    return result
+
+@router.get("/vote/queue/stats")
+def get_ballot_queue_stats(
+    _= Depends(check_roles(allowed_admin_types=[AdminType.school]))
+):
+    """投票写入队列的监控数据：队列深度、未确认消息数和刷写延迟"""
+    return BallotQueue.get_stats()
 
 @router.post("/activities/", response_model=ActivityResponse)
 def create_activity(
@@ -156,9 +259,12 @@ def get_activities(
 
 @router.get("/activities/active/", response_model=List[ActivityResponse])
 def get_active_activities(
+    response: Response,
     db: Session = Depends(get_db),
     # 任何人
 ):
+    # 活动配置变更后各worker最迟在版本检查间隔内刷新
+    response.headers["Cache-Control"] = f"public, max-age={ACTIVITY_CACHE_CONFIG['version_check_interval']}"
     return VoteService.get_active_activities(db)
 
 @router.put("/activities/{activity_id}", response_model=ActivityResponse)
@@ -258,16 +364,7 @@ def update_candidate(
             description=f"更新候选人 {db_candidate.name} 的信息 学院: {db_candidate.college_name} 照片: {db_candidate.photo} 简介: {db_candidate.bio} 引言: {db_candidate.quote} 视频链接: {db_candidate.video_url}"
         )
         
-        vote_count = db.query(Vote).filter(Vote.candidate_id == candidate_id).count()
-        return CandidateResponse(
-            id=db_candidate.id,
-            name=db_candidate.name,
-            college_id=db_candidate.college_id,
-            photo=db_candidate.photo,
-            bio=db_candidate.bio,
-            college_name=db_candidate.college_name,
-            vote_count=vote_count
-        )
+        return VoteService.to_candidate_responses(db, [db_candidate])[0]
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -335,10 +432,13 @@ def get_my_activity_votes(
 @router.get("/vote-trends", response_model=VoteTrendResponse)
 def get_vote_trends(
     request: Request,
+    granularity: str = Query("day", description="统计粒度: hour、day 或 custom"),
+    bucket_minutes: Optional[int] = Query(None, description="custom 粒度下每个时间桶的分钟数"),
+    tz: str = Query("Asia/Shanghai", description="分桶使用的时区"),
     db: Session = Depends(get_db),
     user_session = Depends(check_roles())  # 所有登录的人
 ):
-    """获取投票趋势数据，包括每日投票总数和各候选人投票数"""
+    """获取投票趋势数据，包括每个时间桶的投票总数和各候选人投票数"""
     
     # 记录操作日志
     AdminLogService.log_admin_action(
@@ -350,7 +450,10 @@ def get_vote_trends(
         description="查看投票趋势数据"
     )
     
-    return VoteService.get_vote_trends(db)
+    try:
+        return VoteService.get_vote_trends(db, granularity, bucket_minutes, tz)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/statistics/total", response_model=TotalVoteStats)
 def get_total_vote_statistics(
@@ -412,6 +515,10 @@ async def export_vote_data(
     college_id: Optional[str] = None,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
+    exact: bool = Query(True, description="是否精确统计投票人数，传false时进行中的活动使用近似值"),
+    export_format: str = Query("json", alias="format", description="导出格式：json/csv/excel/parquet/arrow"),
+    limit: Optional[int] = Query(None, description="vote_records每页记录数，默认返回全部"),
+    after: Optional[str] = Query(None, description="vote_records分页游标，取上一页的next_cursor"),
     db: Session = Depends(get_db),
     request: Request = None,
     user_session = Depends(check_roles(allowed_admin_types=[AdminType.school, AdminType.college]))
@@ -442,12 +549,47 @@ async def export_vote_data(
             description=f"导出活动 {activity_title} 的{export_type}数据"
         )
         
-        if export_type == 'vote_records':
-            data = await VoteService.get_vote_records(db, activity_id, college_id, start_date, end_date)
-        elif export_type == 'candidate_stats':
-            data = await VoteService.get_candidate_stats(db, activity_id, college_id, start_date, end_date)
-        else:
-            raise HTTPException(status_code=400, detail=f"不支持的导出类型: {export_type}")
+        # 数据版本号需在查询之前读取，查询期间有新选票时结果缓存在旧版本下
+        version = ExportCache.version(activity_id)
+        cache_params = {
+            "export_type": export_type,
+            "college_id": college_id,
+            "start_date": start_date,
+            "end_date": end_date,
+            "exact": exact
+        }
+        
+        # 文件格式以流式响应返回，记录通过服务端游标分块读取
+        if export_format != "json":
+            VoteExporter.check(export_type, export_format, start_date, end_date)
+            media_type, extension = VoteExporter.FORMATS[export_format]
+            cache_path = ExportCache.file_path(activity_id, version, cache_params, extension)
+            if cache_path and os.path.exists(cache_path):
+                return FileResponse(
+                    cache_path,
+                    media_type=media_type,
+                    filename=VoteExporter.filename(activity_id, export_type, extension),
+                    headers={"X-Export-Cache": "hit"}
+                )
+            return VoteExporter.stream(
+                export_type, export_format, activity_id, college_id, start_date, end_date, exact,
+                cache_path=cache_path
+            )
+        
+        cache_params.update({"view": "export", "limit": limit, "after": after})
+        data = ExportCache.get(activity_id, version, cache_params)
+        if data is None:
+            if export_type == 'vote_records':
+                data = await VoteService.get_vote_records(db, activity_id, college_id, start_date, end_date, limit=limit, after=after)
+            elif export_type == 'candidate_stats':
+                data = await VoteService.get_candidate_stats(db, activity_id, college_id, start_date, end_date, exact=exact)
+            elif export_type == 'college_turnout':
+                data = VoteService.get_voter_college_turnout(db, activity_id, start_date, end_date, college_id)
+            else:
+                raise HTTPException(status_code=400, detail=f"不支持的导出类型: {export_type}")
+            # 投票人学院未补全的结果不缓存
+            if not data.get("partial"):
+                ExportCache.set(activity_id, version, cache_params, data)
         
         return {
             "activity": {
@@ -462,6 +604,71 @@ async def export_vote_data(
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@router.post("/export/jobs")
+async def create_export_job(
+    activity_id: int = Query(..., description="活动ID"),
+    export_type: str = Query(..., description="导出数据类型"),
+    college_id: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    exact: bool = Query(True, description="是否精确统计投票人数，传false时进行中的活动使用近似值"),
+    export_format: str = Query("csv", alias="format", description="导出格式：csv/excel/parquet/arrow"),
+    db: Session = Depends(get_db),
+    request: Request = None,
+    user_session = Depends(check_roles(allowed_admin_types=[AdminType.school, AdminType.college]))
+):
+    """提交后台导出任务，返回任务ID，通过进度接口查询状态"""
+    # 院级管理员只能导出本学院的数据
+    if user_session.admin_type == AdminType.college:
+        if college_id and college_id != user_session.admin_college_id:
+            raise HTTPException(status_code=403, detail="院级管理员只能导出本学院的数据")
+        college_id = user_session.admin_college_id
+    
+    activity = db.query(VoteActivity).filter(VoteActivity.id == activity_id).first()
+    if not activity:
+        raise HTTPException(status_code=404, detail="活动不存在")
+    
+    try:
+        job = ExportJobService.create(
+            db, request, user_session, activity, export_type, export_format,
+            college_id, start_date, end_date, exact
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    ExportJobService.submit(job.id)
+    return ExportJobService.to_progress(job)
+
+def _get_export_job(db: Session, job_id: str, user_session) -> ExportJob:
+    job = db.query(ExportJob).filter(ExportJob.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="导出任务不存在")
+    if not ExportJobService.can_access(job, user_session):
+        raise HTTPException(status_code=403, detail="无权访问该导出任务")
+    return job
+
+@router.get("/export/jobs/{job_id}")
+def get_export_job(
+    job_id: str,
+    db: Session = Depends(get_db),
+    user_session = Depends(check_roles(allowed_admin_types=[AdminType.school, AdminType.college]))
+):
+    """查询导出任务进度"""
+    return ExportJobService.to_progress(_get_export_job(db, job_id, user_session))
+
+@router.get("/export/jobs/{job_id}/download")
+def download_export_job(
+    job_id: str,
+    db: Session = Depends(get_db),
+    user_session = Depends(check_roles(allowed_admin_types=[AdminType.school, AdminType.college]))
+):
+    """下载已完成的导出文件"""
+    job = _get_export_job(db, job_id, user_session)
+    try:
+        path, filename, media_type = ExportJobService.file_info(job)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return FileResponse(path, media_type=media_type, filename=filename)
+
 @router.get("/preview")
 async def preview_vote_data(
     activity_id: int = Query(..., description="活动ID"),
@@ -470,6 +677,8 @@ async def preview_vote_data(
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
     limit: int = Query(10, description="预览记录数上限"),
+    after: Optional[str] = Query(None, description="vote_records分页游标，取上一页的next_cursor"),
+    exact: bool = Query(False, description="是否精确统计投票人数，默认进行中的活动使用近似值（返回approximate=true）"),
     db: Session = Depends(get_db),
     request: Request = None,
     user_session = Depends(check_roles(allowed_admin_types=[AdminType.school, AdminType.college]))
@@ -503,16 +712,35 @@ async def preview_vote_data(
             description=f"预览活动 {activity.title} 的{export_type}数据"
         )
         
+        version = ExportCache.version(activity_id)
+        cache_params = {
+            "view": "preview",
+            "export_type": export_type,
+            "college_id": college_id,
+            "start_date": start_date,
+            "end_date": end_date,
+            "exact": exact,
+            "limit": limit,
+            "after": after
+        }
+        data = ExportCache.get(activity_id, version, cache_params)
+        
         # 根据预览类型获取数据
-        if export_type == 'vote_records':
-            data = await VoteService.get_vote_records(db, activity_id, college_id, start_date, end_date, limit=limit)
-        elif export_type == 'candidate_stats':
-            data = await VoteService.get_candidate_stats(db, activity_id, college_id, start_date, end_date)
-            # 限制预览记录数
-            if data and 'records' in data and len(data['records']) > limit:
-                data['records'] = data['records'][:limit]
-        else:
-            raise HTTPException(status_code=400, detail=f"不支持的预览类型: {export_type}")
+        if data is None:
+            if export_type == 'vote_records':
+                data = await VoteService.get_vote_records(db, activity_id, college_id, start_date, end_date, limit=limit, after=after)
+            elif export_type == 'candidate_stats':
+                data = await VoteService.get_candidate_stats(db, activity_id, college_id, start_date, end_date, exact=exact)
+                # 限制预览记录数
+                if data and 'records' in data and len(data['records']) > limit:
+                    data['records'] = data['records'][:limit]
+            elif export_type == 'college_turnout':
+                data = VoteService.get_voter_college_turnout(db, activity_id, start_date, end_date, college_id)
+            else:
+                raise HTTPException(status_code=400, detail=f"不支持的预览类型: {export_type}")
+            # 投票人学院未补全的结果不缓存
+            if not data.get("partial"):
+                ExportCache.set(activity_id, version, cache_params, data)
         
         return {
             "activity": {
@@ -528,61 +756,16 @@ async def preview_vote_data(
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/colleges/")
-async def get_colleges(
-    db: Session = Depends(get_db)
+def get_colleges(
+    request: Request
     # 无权限要求
 ):
-    """学院信息代理接口，用于解决跨域问题"""
-    # 备用学院信息数据
-    fallback_data = [
-        {"YXDM":"0519000","YXDM_TEXT":"国际教育学院"},
-        {"YXDM":"0501000","YXDM_TEXT":"航空学院"},
-        {"YXDM":"0502000","YXDM_TEXT":"能源与动力学院"},
-        {"YXDM":"0503000","YXDM_TEXT":"自动化学院"},
-        {"YXDM":"0504000","YXDM_TEXT":"电子信息工程学院"},
-        {"YXDM":"0505000","YXDM_TEXT":"机电学院"},
-        {"YXDM":"0506000","YXDM_TEXT":"材料科学与技术学院"},
-        {"YXDM":"0509000","YXDM_TEXT":"经济与管理学院"},
-        {"YXDM":"0515000","YXDM_TEXT":"航天学院"},
-        {"YXDM":"0516000","YXDM_TEXT":"计算机科学与技术学院/软件学院"},
-        {"YXDM":"0507000","YXDM_TEXT":"民航学院"},
-        {"YXDM":"0525000","YXDM_TEXT":"集成电路学院"},
-        {"YXDM":"0517000","YXDM_TEXT":"马克思主义学院"},
-        {"YXDM":"0522000","YXDM_TEXT":"数学学院"},
-        {"YXDM":"0523000","YXDM_TEXT":"物理学院"},
-        {"YXDM":"0510000","YXDM_TEXT":"人文与社会科学学院"},
-        {"YXDM":"0511000","YXDM_TEXT":"艺术学院"},
-        {"YXDM":"0520000","YXDM_TEXT":"通用航空与飞行学院"},
-        {"YXDM":"0512000","YXDM_TEXT":"外国语学院"},
-        {"YXDM":"0218000","YXDM_TEXT":"教师发展与教学评估中心/高等教育研究所"},
-        {"YXDM":"0526000","YXDM_TEXT":"人工智能学院"}
-    ]
-    
-    # 保存学院数据的本地文件路径
-    cache_file = os.path.join(os.path.dirname(__file__), 'college_cache.json')
-    
-    try:
-        # 优先使用缓存
-        if os.path.exists(cache_file):
-            with open(cache_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-                
-        # 如果没有缓存，尝试从原站获取
-        async with httpx.AsyncClient() as client:
-            response = await client.get('https://class101.nuaa.edu.cn/yx_info/', timeout=5.0)
-            if response.status_code == 200:
-                college_data = response.json()
-                # 缓存获取的数据
-                with open(cache_file, 'w', encoding='utf-8') as f:
-                    json.dump(college_data, f, ensure_ascii=False)
-                return college_data
-            else:
-                # 原站获取失败，使用备用数据
-                return fallback_data
-    except Exception as e:
-        print(f"获取学院信息错误: {e}")
-        # 请求失败时使用备用数据
-        return fallback_data
+    """学院信息代理接口，用于解决跨域问题（数据由后台任务定期从class101刷新）"""
+    colleges, etag = CollegeCatalog.get()
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={COLLEGE_CONFIG['max_age']}"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(content=colleges, headers=headers)
 
 @router.post("/upload-image/", response_model=dict)
 async def upload_image(
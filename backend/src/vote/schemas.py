@@ -73,9 +73,17 @@ class VoteTrendItem(BaseModel):
     candidate_id: Optional[int] = None
     candidate_name: Optional[str] = None
 
+class VoteTrendSeries(BaseModel):
+    candidate_id: int
+    candidate_name: str
+    counts: List[int]  # 与 buckets 一一对应
+
 class VoteTrendResponse(BaseModel):
     trends: List[VoteTrendItem]
-    daily_totals: List[VoteTrendItem]
+    daily_totals: List[VoteTrendItem]  # 按桶统计的总票数，日粒度时即每日总数
+    granularity: str = "day"
+    buckets: List[str] = []
+    series: List[VoteTrendSeries] = []
 
 # Adding new schemas for data export
 class ExportParams(BaseModel):
@@ -1,21 +1,39 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import func, desc, text
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import func, desc, text, insert, and_
+from sqlalchemy.exc import IntegrityError
 from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 from fastapi import HTTPException, Query
 from typing import Optional, List, Dict, Any, Tuple, Union
 import logging
+import base64
+import math
 from logging.handlers import RotatingFileHandler
 import json
 import re
 import os
 import httpx
+import redis
 
 from sqlalchemy.sql.operators import is_associative
 
 from backend.src.auth.service import AuthService
 
-from ..models import Candidate, Vote, VoteActivity, ActivityCandidateAssociation
-from .schemas import CandidateCreate, ActivityCreate, VoteTrendItem, VoteTrendResponse
+from ..models import Candidate, Vote, VoteActivity, ActivityCandidateAssociation, VoteMinuteBucket, StudentDirectory
+from .schemas import CandidateCreate, CandidateResponse, ActivityCreate, VoteTrendItem, VoteTrendResponse, VoteTrendSeries
+from .voter_registry import VoterRegistry
+from .activity_cache import ActivityCache, ActivitySnapshot
+from .tally import TallyStore
+from .rollup import VoteRollup
+from .turnout import TurnoutCounter
+from .leaderboard import Leaderboard
+from .student_info import StudentInfoService
+from .export_cache import ExportCache
+
+
+class BallotRejectedError(ValueError):
+    """选票本身不合法或投票人已投过票，相同请求重试结果不会改变"""
+
 
 class VoteService:
     # Configure logging
@@ -60,6 +78,50 @@ class VoteService:
 
         return results
 
+    @staticmethod
+    def get_active_activity_id(db: Session) -> Optional[int]:
+        """获取当前激活活动的ID"""
+        row = db.query(VoteActivity.id).filter(
+            VoteActivity.is_active == True
+        ).order_by(VoteActivity.id).first()
+        return row[0] if row else None
+
+    @staticmethod
+    def get_live_vote_statistics(db: Session, activity_id: int):
+        """
+        从实时计票读取活动中各候选人的得票，按活动中的候选人顺序返回
+
+        Args:
+            db: 数据库会话
+            activity_id: 活动ID
+
+        Returns:
+            候选人得票列表
+        """
+        activity = ActivityCache.get(db, activity_id)
+        if not activity:
+            return []
+        try:
+            counts = TallyStore.get_counts(db, activity_id)
+        except redis.RedisError as e:
+            VoteService.logger.error(f"读取实时计票失败，改用数据库统计: {str(e)}")
+            return VoteService.get_activity_vote_statistics(db, activity_id)
+
+        candidates = {
+            candidate.id: candidate for candidate in db.query(
+                Candidate.id, Candidate.name, Candidate.college_id
+            ).filter(Candidate.id.in_(activity.candidate_order))
+        }
+        return [
+            {
+                'candidate_id': cid,
+                'name': candidates[cid].name,
+                'college_id': candidates[cid].college_id,
+                'vote_count': counts.get(cid, 0)
+            }
+            for cid in activity.candidate_order if cid in candidates
+        ]
+
     @staticmethod
     def create_candidate(db: Session, candidate: CandidateCreate):
         try:
@@ -89,31 +151,44 @@ class VoteService:
         return query.all()
 
     @staticmethod
-    def create_vote(db: Session, candidate_id: int, voter_id: str, activity_id: int):
-
-        candidate = db.query(Candidate).filter(Candidate.id == candidate_id).first()
-        if not candidate:
-            raise ValueError("候选人不存在")
-
-        vote_count = db.query(Vote).filter(Vote.candidate_id == candidate_id).count()
+    def get_vote_counts(db: Session, candidate_ids: List[int]) -> Dict[int, int]:
+        """
+        一条分组查询获取多个候选人的总得票数
 
+        Args:
+            db: 数据库会话
+            candidate_ids: 候选人ID列表
 
-        existing_vote = db.query(Vote).filter(
-            Vote.candidate_id == candidate_id,
-            Vote.voter_id == voter_id,
-            Vote.activity_id == activity_id
-        ).first()
-        if existing_vote:
-            raise ValueError("User has already voted")
+        Returns:
+            候选人ID到得票数的字典，没有投票记录的候选人不在字典中
+        """
+        if not candidate_ids:
+            return {}
+        return dict(db.query(
+            Vote.candidate_id,
+            func.count(Vote.id)
+        ).filter(
+            Vote.candidate_id.in_(candidate_ids)
+        ).group_by(
+            Vote.candidate_id
+        ).all())
 
-        try:
-            vote = Vote(candidate_id=candidate_id, voter_id=voter_id, activity_id=activity_id)
-            db.add(vote)
-            db.commit()
-            return vote
-        except ValueError as e:
-            db.rollback()
-            raise ValueError(str(e))
+    @staticmethod
+    def to_candidate_responses(db: Session, candidates: List[Candidate]) -> List[CandidateResponse]:
+        """为一组候选人构建CandidateResponse，得票数通过一次查询批量获取"""
+        vote_counts = VoteService.get_vote_counts(db, [candidate.id for candidate in candidates])
+        return [
+            CandidateResponse(
+                id=candidate.id,
+                name=candidate.name,
+                college_id=candidate.college_id,
+                photo=candidate.photo,
+                bio=candidate.bio,
+                college_name=candidate.college_name,
+                vote_count=vote_counts.get(candidate.id, 0)
+            )
+            for candidate in candidates
+        ]
 
     @staticmethod
     def get_activity_votes(db: Session, voter_id: str, activity_id: int):
@@ -149,64 +224,46 @@ class VoteService:
                 db.add(association)
             db.commit()
             db.refresh(db_activity)
-            return {
-                "id": db_activity.id,
-                "title": db_activity.title,
-                "description": db_activity.description,
-                "start_time": db_activity.start_time,
-                "end_time": db_activity.end_time,
-                "is_active": db_activity.is_active,
-                "max_votes": db_activity.max_votes,
-                "min_votes": db_activity.min_votes,
-                "candidate_ids": activity.candidate_ids
-            }
+            ActivityCache.invalidate(db_activity.id)
+            return VoteService.serialize_activity(db_activity)
         except Exception as e:
             db.rollback()
             raise ValueError(str(e))
 
+    @staticmethod
+    def serialize_activity(activity: VoteActivity) -> Dict[str, Any]:
+        """将活动转换为ActivityResponse结构，候选人按position排序"""
+        return {
+            "id": activity.id,
+            "title": activity.title,
+            "description": activity.description,
+            "start_time": activity.start_time,
+            "end_time": activity.end_time,
+            "is_active": activity.is_active,
+            "max_votes": activity.max_votes,
+            "min_votes": activity.min_votes,
+            "candidate_ids": [assoc.candidate_id for assoc in activity.associations]
+        }
+
+    @staticmethod
+    def _load_activities(db: Session, active_only: bool = False) -> List[Dict[str, Any]]:
+        # 一次性预加载所有活动的候选人关联，避免逐个活动查询
+        query = db.query(VoteActivity).options(selectinload(VoteActivity.associations))
+        if active_only:
+            query = query.filter(VoteActivity.is_active == True)
+        return [VoteService.serialize_activity(activity) for activity in query.order_by(VoteActivity.id)]
+
     @staticmethod
     def get_activities(db: Session):
-        activities = []
-        for activity in db.query(VoteActivity).all():
-            # Get associations sorted by position
-            associations = db.query(ActivityCandidateAssociation).filter(
-                ActivityCandidateAssociation.activity_id == activity.id
-            ).order_by(ActivityCandidateAssociation.position).all()
-            
-            activities.append({
-                "id": activity.id,
-                "title": activity.title,
-                "description": activity.description,
-                "start_time": activity.start_time,
-                "end_time": activity.end_time,
-                "is_active": activity.is_active,
-                "max_votes": activity.max_votes,
-                "min_votes": activity.min_votes,
-                "candidate_ids": [assoc.candidate_id for assoc in associations]
-            })
-        return activities
+        return VoteService._load_activities(db)
 
     @staticmethod
     def get_active_activities(db: Session):
-        activities = []
-        for activity in db.query(VoteActivity).filter(VoteActivity.is_active == True).all():
-            # Get associations sorted by position
-            associations = db.query(ActivityCandidateAssociation).filter(
-                ActivityCandidateAssociation.activity_id == activity.id
-            ).order_by(ActivityCandidateAssociation.position).all()
-            
-            activities.append({
-                "id": activity.id,
-                "title": activity.title,
-                "description": activity.description,
-                "start_time": activity.start_time,
-                "end_time": activity.end_time,
-                "is_active": activity.is_active,
-                "max_votes": activity.max_votes,
-                "min_votes": activity.min_votes,
-                "candidate_ids": [assoc.candidate_id for assoc in associations]
-            })
-        return activities
+        # 激活活动列表随活动配置版本号失效，可在进程内缓存
+        return list(ActivityCache.get_derived(
+            "active_activities",
+            lambda: VoteService._load_activities(db, active_only=True)
+        ))
 
     @staticmethod
     def update_activity(db: Session, activity_id: int, activity: ActivityCreate):
@@ -240,23 +297,10 @@ class VoteService:
                 VoteActivity.deactivate_others(db, exclude_id=activity_id)
             db.commit()
             db.refresh(db_activity)
+            ActivityCache.invalidate(activity_id)
+            ExportCache.bump(activity_id)
             
-            # Get associations sorted by position for response
-            associations = db.query(ActivityCandidateAssociation).filter(
-                ActivityCandidateAssociation.activity_id == activity_id
-            ).order_by(ActivityCandidateAssociation.position).all()
-            
-            return {
-                "id": db_activity.id,
-                "title": db_activity.title,
-                "description": db_activity.description,
-                "start_time": db_activity.start_time,
-                "end_time": db_activity.end_time,
-                "is_active": db_activity.is_active,
-                "max_votes": db_activity.max_votes,
-                "min_votes": db_activity.min_votes,
-                "candidate_ids": [assoc.candidate_id for assoc in associations]
-            }
+            return VoteService.serialize_activity(db_activity)
         except ValueError as e:
             VoteService.logger.error(f"Validation error: {str(e)}")
             raise
@@ -269,13 +313,30 @@ class VoteService:
 
         try:
             db.query(Vote).filter(Vote.activity_id == activity_id).delete()
+            db.query(VoteMinuteBucket).filter(VoteMinuteBucket.activity_id == activity_id).delete()
             db.delete(db_activity)
             db.commit()
+            ActivityCache.invalidate(activity_id)
+            ExportCache.bump(activity_id)
+            ExportCache.clear_files(activity_id)
+            VoterRegistry.clear(activity_id)
+            TallyStore.clear(activity_id)
+            TurnoutCounter.clear(activity_id)
+            Leaderboard.clear(activity_id)
             return True
         except ValueError as e:
             VoteService.logger.warning(f"Business rule violation: {e}")
             raise
 
+    @staticmethod
+    def _candidate_activity_ids(db: Session, candidate_id: int) -> List[int]:
+        return [
+            activity_id for (activity_id,) in
+            db.query(ActivityCandidateAssociation.activity_id).filter(
+                ActivityCandidateAssociation.candidate_id == candidate_id
+            )
+        ]
+
     @staticmethod
     def update_candidate(db: Session, candidate_id: int, candidate: CandidateCreate):
         db_candidate = db.query(Candidate).filter(Candidate.id == candidate_id).first()
@@ -299,6 +360,8 @@ class VoteService:
 
             db.commit()
             db.refresh(db_candidate)
+            # 候选人信息出现在导出结果中，使其所在活动的导出缓存失效
+            ExportCache.bump(*VoteService._candidate_activity_ids(db, candidate_id))
             return db_candidate
         except Exception as e:
             db.rollback()
@@ -310,8 +373,10 @@ class VoteService:
         if not db_candidate:
             raise ValueError("Candidate not found")
         try:
+            activity_ids = VoteService._candidate_activity_ids(db, candidate_id)
             db.delete(db_candidate)
             db.commit()
+            ExportCache.bump(*activity_ids)
         except Exception as e:
             db.rollback()
             VoteService.logger.error(f"Error deleting candidate: {str(e)}")
@@ -343,6 +408,8 @@ class VoteService:
             # 删除关联
             db.delete(association)
             db.commit()
+            ActivityCache.invalidate(activity_id)
+            ExportCache.bump(activity_id)
             VoteService.logger.info(f"已从活动 {activity_id} 中移除候选人 {candidate_id}")
             return True
         except Exception as e:
@@ -351,140 +418,313 @@ class VoteService:
             raise ValueError(f"移除候选人失败: {str(e)}")
 
     @staticmethod
-    def create_bulk_votes(db: Session, candidate_ids: List[int], voter_id: str, activity_id: int):
+    def _validate_ballot(activity: ActivitySnapshot, candidate_ids: List[int]):
+        """
+        对整张选票做一次性校验
+
+        Args:
+            activity: 活动配置快照
+            candidate_ids: 选票中的候选人ID列表
+
+        Raises:
+            BallotRejectedError: 选票不合法或活动已结束时抛出
+            ValueError: 活动未激活或尚未开始时抛出
+        """
+        # 检查活动是否激活
+        if not activity.is_active:
+            raise ValueError("该投票活动未激活，无法进行投票")
+
+        # 检查活动是否过期
+        current_time = datetime.now()
+        if current_time < activity.start_time:
+            raise ValueError("投票活动尚未开始")
+        if current_time > activity.end_time:
+            raise BallotRejectedError("投票活动已结束")
+
+        # 检查投票数量是否符合要求
+        if len(candidate_ids) < activity.min_votes:
+            raise BallotRejectedError(f"至少需要投票给{activity.min_votes}名候选人")
+        if len(candidate_ids) > activity.max_votes:
+            raise BallotRejectedError(f"最多只能投票给{activity.max_votes}名候选人")
+
+        # 检查候选人是否都在当前活动中
+        invalid_candidates = [cid for cid in candidate_ids if cid not in activity.candidate_ids]
+        if invalid_candidates:
+            raise BallotRejectedError(f"选择的候选人中有{len(invalid_candidates)}名不在该活动中")
+
+        # 检查是否有重复的候选人ID
+        if len(candidate_ids) != len(set(candidate_ids)):
+            raise BallotRejectedError("不能对同一个候选人投多次票")
+
+    @staticmethod
+    def check_ballot(db: Session, candidate_ids: List[int], voter_id: str, activity_id: int):
+        """
+        校验选票能否写入：活动配置和候选人范围
+
+        Args:
+            db: 数据库会话
+            candidate_ids: 选票中的候选人ID列表
+            voter_id: 投票人工号
+            activity_id: 活动ID
+
+        Raises:
+            BallotRejectedError: 选票不合法时抛出
+            ValueError: 活动暂时不可投票（未激活或尚未开始）时抛出
+        """
+        # 获取活动配置快照
+        activity = ActivityCache.get(db, activity_id)
+        if not activity:
+            raise BallotRejectedError("投票活动不存在")
+
+        VoteService._validate_ballot(activity, candidate_ids)
+
+    @staticmethod
+    def claim_voter(db: Session, activity_id: int, voter_id: str):
+        """
+        在活动的已投票集合中为投票人占位，已投过票时抛出异常
+
+        Redis不可用时退回到数据库查询，并标记集合需要重建
+        """
         try:
-            # 获取活动配置
-            activity = db.query(VoteActivity).filter(VoteActivity.id == activity_id).first()
-            if not activity:
-                raise ValueError("投票活动不存在")
-            
-            # 检查活动是否激活
-            if not activity.is_active:
-                raise ValueError("该投票活动未激活，无法进行投票")
-            
-            # 检查活动是否过期
-            current_time = datetime.now()
-            if current_time < activity.start_time:
-                raise ValueError("投票活动尚未开始")
-            if current_time > activity.end_time:
-                raise ValueError("投票活动已结束")
-            
-            # 检查投票数量是否符合要求
-            if len(candidate_ids) < activity.min_votes:
-                raise ValueError(f"至少需要投票给{activity.min_votes}名候选人")
-            if len(candidate_ids) > activity.max_votes:
-                raise ValueError(f"最多只能投票给{activity.max_votes}名候选人")
-            
-            # 检查候选人是否都在当前活动中
-            activity_candidate_ids = [assoc.candidate_id for assoc in activity.associations]
-            invalid_candidates = [cid for cid in candidate_ids if cid not in activity_candidate_ids]
-            if invalid_candidates:
-                raise ValueError(f"选择的候选人中有{len(invalid_candidates)}名不在该活动中")
-            
-            # 检查是否有重复的候选人ID
-            if len(candidate_ids) != len(set(candidate_ids)):
-                raise ValueError("不能对同一个候选人投多次票")
-            
-            # 检查用户是否已经在此活动中投过票
-            existing_votes = db.query(Vote).filter(
+            claimed = VoterRegistry.claim(db, activity_id, voter_id)
+        except redis.RedisError as e:
+            VoteService.logger.error(f"投票人集合不可用，改用数据库检查: {str(e)}")
+            VoterRegistry.mark_stale(activity_id)
+            claimed = db.query(Vote.id).filter(
                 Vote.voter_id == voter_id,
                 Vote.activity_id == activity_id
-            ).count()
-            
-            if existing_votes > 0:
-                raise ValueError("您已经在此活动中投过票了")
-        
-            results = {'success_count': 0, 'errors': []}
-            # db.begin()下  
-            for cid in candidate_ids:
-                try:
-                    VoteService.create_vote(db, cid, voter_id, activity_id)
-                    results['success_count'] += 1
-                except Exception as e:
-                    results['errors'].append({'candidate_id': cid, 'error': str(e)})
-            if len(results['errors']) > 0:
+            ).first() is None
+        if not claimed:
+            raise BallotRejectedError("您已经在此活动中投过票了")
+
+    @staticmethod
+    def after_ballots_committed(ballots: List[Dict[str, Any]]):
+        """
+        选票提交后更新Redis中的派生数据，失败不影响投票结果，由校准任务修正
+
+        Args:
+            ballots: 已提交的选票列表，每项包含activity_id、voter_id、candidate_ids和created_at
+        """
+        try:
+            TallyStore.record_ballots(ballots)
+        except Exception as e:
+            VoteService.logger.error(f"更新实时计票失败: {str(e)}")
+        try:
+            TurnoutCounter.record_ballots(ballots)
+        except Exception as e:
+            VoteService.logger.error(f"更新投票人数统计失败: {str(e)}")
+        try:
+            Leaderboard.record_ballots(ballots)
+        except Exception as e:
+            VoteService.logger.error(f"更新排行榜失败: {str(e)}")
+        # 递增数据版本号，使导出缓存失效
+        ExportCache.bump(*{ballot["activity_id"] for ballot in ballots})
+
+    @staticmethod
+    def create_bulk_votes(db: Session, candidate_ids: List[int], voter_id: str, activity_id: int):
+        """
+        以整张选票为单位写入投票：一次校验，一条多行INSERT，一次提交
+
+        Args:
+            db: 数据库会话
+            candidate_ids: 选票中的候选人ID列表
+            voter_id: 投票人工号
+            activity_id: 活动ID
+
+        Returns:
+            包含成功数和错误列表的字典
+        """
+        try:
+            VoteService.check_ballot(db, candidate_ids, voter_id, activity_id)
+            VoteService.claim_voter(db, activity_id, voter_id)
+
+            # 整张选票一条多行INSERT，重复写入由uq_vote_record兜底
+            created_at = datetime.now()
+            rows = [
+                {"candidate_id": cid, "voter_id": voter_id, "activity_id": activity_id, "created_at": created_at}
+                for cid in candidate_ids
+            ]
+            try:
+                db.execute(insert(Vote).values(rows))
+                VoteRollup.apply(db, rows)
+                db.commit()
+            except IntegrityError as e:
                 db.rollback()
-                return results
-            db.commit()
-            return results
+                if e.orig is not None and e.orig.args and e.orig.args[0] == 1062:
+                    # 唯一约束冲突，选票已由并发请求写入，保留占位
+                    raise BallotRejectedError("您已经在此活动中投过票了")
+                # 其他约束错误（如候选人已被删除）选票没有写入，释放占位
+                VoterRegistry.release(activity_id, voter_id)
+                raise
+            except Exception:
+                db.rollback()
+                VoterRegistry.release(activity_id, voter_id)
+                raise
+
+            VoteService.after_ballots_committed([
+                {"activity_id": activity_id, "voter_id": voter_id, "candidate_ids": candidate_ids, "created_at": created_at}
+            ])
+            return {'success_count': len(rows), 'errors': []}
+        except BallotRejectedError as e:
+            db.rollback()
+            VoteService.logger.error(f"投票失败: {str(e)}")
+            raise BallotRejectedError(f"投票失败: {str(e)}")
         except Exception as e:
             db.rollback()
             VoteService.logger.error(f"投票失败: {str(e)}")
             raise ValueError(f"投票失败: {str(e)}")
 
+    TREND_GRANULARITIES = {"hour": 3600, "day": 86400}
+    TREND_MAX_BUCKETS = 5000
+
     @staticmethod
-    def get_vote_trends(db: Session) -> VoteTrendResponse:
-        """获取投票趋势数据，按日期统计总投票数和每个候选人的投票数"""
-        # 获取当前活动
-        active_activities = VoteService.get_active_activities(db)
-        if not active_activities:
-            return VoteTrendResponse(trends=[], daily_totals=[])
-        
-        activity_id = active_activities[0]["id"]
+    def _trend_bucket_seconds(granularity: str, bucket_minutes: Optional[int]) -> int:
+        if granularity == "custom":
+            if not bucket_minutes or bucket_minutes <= 0:
+                raise ValueError("自定义粒度需要提供大于0的bucket_minutes")
+            return bucket_minutes * 60
+        if granularity not in VoteService.TREND_GRANULARITIES:
+            raise ValueError(f"不支持的统计粒度: {granularity}")
+        return VoteService.TREND_GRANULARITIES[granularity]
 
-        # 计算最早投票日期和当前日期
-        earliest_vote = db.query(func.min(Vote.created_at)).filter(Vote.activity_id == activity_id).scalar()
-        if not earliest_vote:
-            return VoteTrendResponse(trends=[], daily_totals=[])
-        
-        today = datetime.now().date()
-        start_date = earliest_vote.date()
-        
-        # 生成日期范围
-        date_range = [(start_date + timedelta(days=i)).strftime('%Y-%m-%d') 
-                      for i in range((today - start_date).days + 1)]
-        
-        # 查询每天的投票总数
-        daily_totals_query = (
-            db.query(
-                func.date(Vote.created_at).label('date'),
-                func.count().label('count')
-            )
-            .filter(Vote.activity_id == activity_id)
-            .group_by(func.date(Vote.created_at))
-            .all()
-        )
-        
-        daily_totals = []
-        for date_str in date_range:
-            count = 0
-            for record in daily_totals_query:
-                if record.date.strftime('%Y-%m-%d') == date_str:
-                    count = record.count
-                    break
-            daily_totals.append(VoteTrendItem(date=date_str, count=count))
-        
-        # 查询每个候选人每天的投票数
-        candidate_trends_query = (
-            db.query(
-                Candidate.id.label('candidate_id'),
-                Candidate.name.label('candidate_name'),
-                func.date(Vote.created_at).label('date'),
-                func.count().label('count')
+    # 按投票时间（应用主机本地时间，naive）在SQL中预先合并的最大分钟数，
+    # 15分钟可以整除所有时区偏移，转换到目标时区后每个时段只落在一个桶中
+    TREND_SLOT_MINUTES = 15
+
+    @staticmethod
+    def _trend_slot_counts(db: Session, activity_id: int, slot_minutes: int):
+        """
+        在SQL中按固定分钟数的时段汇总每个候选人的得票，数据来自分钟级预聚合表
+
+        时段按bucket_start的墙上时间计算（TIMESTAMPDIFF不受MySQL会话time_zone影响），
+        由调用方换算到目标时区后分桶
+
+        Returns:
+            (candidate_id, 时段开始时间, count) 列表，时段开始时间为应用主机本地时间
+        """
+        slot = func.floor(
+            func.timestampdiff(text("MINUTE"), "1970-01-01 00:00:00", VoteMinuteBucket.bucket_start) / slot_minutes
+        ).label('slot')
+        epoch = datetime(1970, 1, 1)
+        return [
+            (candidate_id, epoch + timedelta(minutes=int(slot_id) * slot_minutes), int(count))
+            for candidate_id, slot_id, count in db.query(
+                VoteMinuteBucket.candidate_id,
+                slot,
+                func.sum(VoteMinuteBucket.vote_count).label('count')
+            ).filter(
+                VoteMinuteBucket.activity_id == activity_id
+            ).group_by(
+                VoteMinuteBucket.candidate_id,
+                slot
             )
-            .join(Vote, Vote.candidate_id == Candidate.id)
-            .filter(Vote.activity_id == activity_id)
-            .group_by(Candidate.id, Candidate.name, func.date(Vote.created_at))
-            .all()
-        )
-        
-        # 处理每个候选人的趋势数据
+        ]
+
+    @staticmethod
+    def _trend_bucket_of(moment: datetime, zone: ZoneInfo, bucket_seconds: int) -> int:
+        """
+        时间点在目标时区墙上时间中的桶编号，按各时间点自己的UTC偏移换算，夏令时切换前后都正确
+
+        naive时间按应用主机本地时间处理（与写入选票时的datetime.now()一致）
+        """
+        wall = moment.astimezone(zone).replace(tzinfo=None)
+        return int((wall - datetime(1970, 1, 1)).total_seconds()) // bucket_seconds
+
+    @staticmethod
+    def get_vote_trends(db: Session, granularity: str = "day", bucket_minutes: Optional[int] = None,
+                        tz: str = "Asia/Shanghai") -> VoteTrendResponse:
+        """
+        获取当前活动的投票趋势，按时间桶统计总投票数和每个候选人的投票数
+
+        Args:
+            db: 数据库会话
+            granularity: 统计粒度，hour、day 或 custom
+            bucket_minutes: custom 粒度下每个桶的分钟数
+            tz: 分桶使用的时区
+
+        Returns:
+            补齐空桶后的总数、候选人稀疏趋势以及按候选人展开的序列
+        """
+        bucket_seconds = VoteService._trend_bucket_seconds(granularity, bucket_minutes)
+        try:
+            zone = ZoneInfo(tz)
+        except (ZoneInfoNotFoundError, ValueError):
+            raise ValueError(f"无效的时区: {tz}")
+        now = datetime.now(zone)
+
+        # 获取当前活动
+        activity_id = VoteService.get_active_activity_id(db)
+        if activity_id is None:
+            return VoteTrendResponse(trends=[], daily_totals=[], granularity=granularity)
+
+        slot_minutes = math.gcd(bucket_seconds // 60, VoteService.TREND_SLOT_MINUTES)
+        rows = VoteService._trend_slot_counts(db, activity_id, slot_minutes)
+        if not rows:
+            return VoteTrendResponse(trends=[], daily_totals=[], granularity=granularity)
+
+        # 时段换算到目标时区后按桶编号累加，总数由候选人分桶结果累加得到
+        totals: Dict[int, int] = {}
+        per_candidate: Dict[int, Dict[int, int]] = {}
+        for candidate_id, slot_start, count in rows:
+            bucket = VoteService._trend_bucket_of(slot_start, zone, bucket_seconds)
+            totals[bucket] = totals.get(bucket, 0) + count
+            counts = per_candidate.setdefault(candidate_id, {})
+            counts[bucket] = counts.get(bucket, 0) + count
+
+        # 补齐到当前时间，活动已结束时只补齐到结束时间
+        end = now
+        activity = ActivityCache.get(db, activity_id)
+        if activity and activity.end_time:
+            end = min(end, activity.end_time.astimezone(zone))
+        first_bucket = min(totals)
+        last_bucket = max(max(totals), VoteService._trend_bucket_of(end, zone, bucket_seconds))
+        if last_bucket - first_bucket + 1 > VoteService.TREND_MAX_BUCKETS:
+            raise ValueError("统计时间桶数量过多，请使用更大的粒度")
+
+        label_format = '%Y-%m-%d' if bucket_seconds % 86400 == 0 else '%Y-%m-%d %H:%M'
+        epoch = datetime(1970, 1, 1)
+        bucket_range = range(first_bucket, last_bucket + 1)
+        labels = {
+            bucket: (epoch + timedelta(seconds=bucket * bucket_seconds)).strftime(label_format)
+            for bucket in bucket_range
+        }
+
+        daily_totals = [VoteTrendItem(date=labels[bucket], count=totals.get(bucket, 0)) for bucket in bucket_range]
+
+        candidate_names = dict(db.query(Candidate.id, Candidate.name).filter(
+            Candidate.id.in_(list(per_candidate.keys()))
+        ).all())
+
         trends = []
-        for record in candidate_trends_query:
-            trends.append(VoteTrendItem(
-                date=record.date.strftime('%Y-%m-%d'),
-                count=record.count,
-                candidate_id=record.candidate_id,
-                candidate_name=record.candidate_name
+        series = []
+        for candidate_id, counts in per_candidate.items():
+            candidate_name = candidate_names.get(candidate_id, "")
+            for bucket in sorted(counts):
+                trends.append(VoteTrendItem(
+                    date=labels[bucket],
+                    count=counts[bucket],
+                    candidate_id=candidate_id,
+                    candidate_name=candidate_name
+                ))
+            series.append(VoteTrendSeries(
+                candidate_id=candidate_id,
+                candidate_name=candidate_name,
+                counts=[counts.get(bucket, 0) for bucket in bucket_range]
             ))
-        
-        return VoteTrendResponse(trends=trends, daily_totals=daily_totals)
+
+        return VoteTrendResponse(
+            trends=trends,
+            daily_totals=daily_totals,
+            granularity=granularity,
+            buckets=[labels[bucket] for bucket in bucket_range],
+            series=series
+        )
 
 
     @staticmethod
     async def get_student_info(stuff_id: str) -> Optional[Dict[str, str]]:
         """
-        Get student information from internal API
+        Get student information from internal API, served from the two-tier cache
         
         Args:
             stuff_id: Student ID
@@ -492,36 +732,116 @@ class VoteService:
         Returns:
             Dictionary containing student information or None if not found
         """
+        return await StudentInfoService.get(stuff_id)
+
+    @staticmethod
+    def vote_records_query(db: Session, activity_id: int, college_id: Optional[str] = None,
+                           start_date: Optional[str] = None, end_date: Optional[str] = None):
+        """
+        Build the query of unique voters (voter_id, college_name from the local student directory)
+
+        Args:
+            db: Database session
+            activity_id: ID of the activity to filter votes
+            college_id: Accepted for signature compatibility; vote records are not filtered by college,
+                since voters missing from the student directory would otherwise be dropped
+            start_date: Optional start date for date range filter (YYYY-MM-DD)
+            end_date: Optional end date for date range filter (YYYY-MM-DD)
+
+        Returns:
+            Query ordered by voter_id
+        """
+        query = db.query(Vote.voter_id, StudentDirectory.college_name).outerjoin(
+            StudentDirectory, StudentDirectory.staff_id == Vote.voter_id
+        ).filter(Vote.activity_id == activity_id).distinct()
+        
+        # Apply date range filter if provided
+        if start_date:
+            start_datetime = datetime.strptime(start_date, "%Y-%m-%d").replace(hour=0, minute=0, second=0)
+            query = query.filter(Vote.created_at >= start_datetime)
+        
+        if end_date:
+            end_datetime = datetime.strptime(end_date, "%Y-%m-%d").replace(hour=23, minute=59, second=59)
+            query = query.filter(Vote.created_at <= end_datetime)
+        
+        return query.order_by(Vote.voter_id)
+
+    @staticmethod
+    def votes_query(db: Session, activity_id: int, college_id: Optional[str] = None,
+                    start_date: Optional[str] = None, end_date: Optional[str] = None):
+        """
+        Build the query of raw vote rows for export
+
+        Args:
+            db: Database session
+            activity_id: ID of the activity to filter votes
+            college_id: Optional ID of the candidate college to filter (same meaning as candidate_stats)
+            start_date: Optional start date for date range filter (YYYY-MM-DD)
+            end_date: Optional end date for date range filter (YYYY-MM-DD)
+
+        Returns:
+            Query of (id, activity_id, candidate_id, voter_id, created_at) ordered by id
+        """
+        query = db.query(
+            Vote.id, Vote.activity_id, Vote.candidate_id, Vote.voter_id, Vote.created_at
+        ).filter(Vote.activity_id == activity_id)
+        
+        if college_id and college_id != 'all':
+            query = query.join(Candidate, Candidate.id == Vote.candidate_id).filter(Candidate.college_id == college_id)
+        
+        if start_date:
+            start_datetime = datetime.strptime(start_date, "%Y-%m-%d").replace(hour=0, minute=0, second=0)
+            query = query.filter(Vote.created_at >= start_datetime)
+        
+        if end_date:
+            end_datetime = datetime.strptime(end_date, "%Y-%m-%d").replace(hour=23, minute=59, second=59)
+            query = query.filter(Vote.created_at <= end_datetime)
+        
+        return query.order_by(Vote.id)
+
+    @staticmethod
+    async def format_voter_records(voters: List[Tuple[str, Optional[str]]]) -> List[Dict[str, Any]]:
+        """
+        Format (voter_id, college_name) rows, enriching voters missing from the directory
+
+        Lookups not finished before the deadline are returned with enriched=False
+        """
+        college_names = {voter_id: college_name for voter_id, college_name in voters if college_name is not None}
+        students = await StudentInfoService.get_many(
+            [voter_id for voter_id, _ in voters if voter_id not in college_names]
+        )
+        for voter_id, student_info in students.items():
+            if student_info is not None:
+                college_names[voter_id] = student_info["college_name"]
+        
+        # Format voter records in the original order
+        return [
+            {
+                "voter_id": voter_id,
+                "voter_college_name": college_names.get(voter_id, ""),
+                "enriched": voter_id in college_names
+            }
+            for voter_id, _ in voters
+        ]
+
+    @staticmethod
+    def encode_cursor(voter_id: str) -> str:
+        """Encode the last voter_id of a page as an opaque cursor token"""
+        return base64.urlsafe_b64encode(voter_id.encode("utf-8")).decode("ascii").rstrip("=")
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> str:
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(f"https://class101.nuaa.edu.cn/stu_info/xgh/{stuff_id}")
-                if response.status_code == 200:
-                    data = response.json()
-                    if data and len(data) > 0:
-                        return {
-                            "name": data[0].get("XM", ""),
-                            "college_id": data[0].get("YXDM", ""),
-                            "college_name": data[0].get("YXDM_TEXT", ""),
-                            "major": data[0].get("ZYMD_TEXT", ""),
-                            "grade": data[0].get("NJ", ""),
-                            "student_type": data[0].get("RYBQDM_TEXT", "")
-                        }
-        except Exception as e:
-            VoteService.logger.error(f"Error fetching student info: {str(e)}")
-        return {
-            "name": "保底数据",
-            "college_id": "0503000",
-            "college_name": "自动化学院",
-            "major": "控制科学与工程",
-            "grade": "2023",
-            "student_type": "研究生"
-        }
+            return base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        except (ValueError, UnicodeDecodeError):
+            raise ValueError("无效的分页游标")
 
     @staticmethod
     async def get_vote_records(db: Session, activity_id: int, college_id: Optional[str] = None, 
-                         start_date: Optional[str] = None, end_date: Optional[str] = None, limit: Optional[int] = None):
+                         start_date: Optional[str] = None, end_date: Optional[str] = None, limit: Optional[int] = None,
+                         after: Optional[str] = None):
         """
-        Get unique voter records for export with filtering options
+        Get unique voter records for export with filtering options, paginated by voter_id (keyset)
         
         Args:
             db: Database session
@@ -530,14 +850,62 @@ class VoteService:
             start_date: Optional start date for date range filter (YYYY-MM-DD)
             end_date: Optional end date for date range filter (YYYY-MM-DD)
             limit: Optional maximum number of records to return
+            after: Optional cursor token (next_cursor of the previous page)
             
         Returns:
-            List of unique voter records formatted for export
+            Unique voter records of this page and next_cursor (None on the last page)
         """
-        # Get unique voters for this activity
-        query = db.query(Vote.voter_id).filter(Vote.activity_id == activity_id).distinct()
+        query = VoteService.vote_records_query(db, activity_id, college_id, start_date, end_date)
+        if after:
+            query = query.filter(Vote.voter_id > VoteService.decode_cursor(after))
+        
+        # Push the limit into SQL, fetching one extra row to detect the next page
+        has_more = False
+        if limit and limit > 0:
+            voters = query.limit(limit + 1).all()
+            has_more = len(voters) > limit
+            voters = voters[:limit]
+        else:
+            voters = query.all()
+        
+        formatted_records = await VoteService.format_voter_records(voters)
+        
+        return {
+            "total_voters": len(voters),
+            "partial": not all(record["enriched"] for record in formatted_records),
+            "records": formatted_records,
+            "next_cursor": VoteService.encode_cursor(voters[-1][0]) if has_more else None
+        }
+    
+    @staticmethod
+    def get_voter_college_turnout(db: Session, activity_id: int, start_date: Optional[str] = None,
+                                  end_date: Optional[str] = None, college_id: Optional[str] = None):
+        """
+        按投票人所在学院统计投票人数，通过本地学生目录在一条SQL中完成
+
+        Args:
+            db: 数据库会话
+            activity_id: 活动ID
+            college_id: 可选的学院ID，只统计该学院（院级管理员只能查看本学院）
+            start_date: 可选的开始日期，格式YYYY-MM-DD
+            end_date: 可选的结束日期，格式YYYY-MM-DD
+
+        Returns:
+            包含总人数和各学院投票人数的字典，目录中没有的投票人计入college_id为空的记录
+        """
+        query = db.query(
+            StudentDirectory.college_id,
+            StudentDirectory.college_name,
+            func.count(func.distinct(Vote.voter_id)).label('voter_count')
+        ).select_from(Vote).outerjoin(
+            StudentDirectory, StudentDirectory.staff_id == Vote.voter_id
+        ).filter(
+            Vote.activity_id == activity_id
+        )
+        
+        if college_id and college_id != 'all':
+            query = query.filter(StudentDirectory.college_id == college_id)
         
-        # Apply date range filter if provided
         if start_date:
             start_datetime = datetime.strptime(start_date, "%Y-%m-%d").replace(hour=0, minute=0, second=0)
             query = query.filter(Vote.created_at >= start_datetime)
@@ -546,32 +914,68 @@ class VoteService:
             end_datetime = datetime.strptime(end_date, "%Y-%m-%d").replace(hour=23, minute=59, second=59)
             query = query.filter(Vote.created_at <= end_datetime)
         
-        # Execute query to get unique voter IDs
-        voter_ids = [v[0] for v in query.all()]
+        rows = query.group_by(
+            StudentDirectory.college_id,
+            StudentDirectory.college_name
+        ).order_by(desc('voter_count')).all()
         
-        # Apply limit if provided (before processing records)
-        if limit and limit > 0:
-            voter_ids = voter_ids[:limit]
-        
-        # Format voter records
-        formatted_records = []
-        for voter_id in voter_ids:
-            # Get student information
-            student_info = await VoteService.get_student_info(voter_id)
-            
-            # Format the record
-            record = {
-                "voter_id": voter_id,
-                "voter_college_name": student_info["college_name"] if student_info else ""
+        records = [
+            {
+                "college_id": row.college_id,
+                "college_name": row.college_name or "未知学院",
+                "voter_count": row.voter_count
             }
-            
-            formatted_records.append(record)
-        
+            for row in rows
+        ]
         return {
-            "total_voters": len(voter_ids),
-            "records": formatted_records
+            "total_voters": sum(record["voter_count"] for record in records),
+            "records": records
         }
     
+    @staticmethod
+    def _candidate_vote_counts(db: Session, activity_id: int, college_id: Optional[str] = None):
+        """
+        一条分组聚合查询取出活动中每个候选人的信息和得票数，按活动中的position排序
+
+        Args:
+            db: Database session
+            activity_id: ID of the activity
+            college_id: Optional ID of the college to filter
+
+        Returns:
+            List of rows with candidate columns and vote_count
+        """
+        query = db.query(
+            Candidate.id,
+            Candidate.name,
+            Candidate.college_id,
+            Candidate.college_name,
+            Candidate.photo,
+            Candidate.bio,
+            func.count(Vote.id).label('vote_count')
+        ).join(
+            ActivityCandidateAssociation, and_(
+                ActivityCandidateAssociation.candidate_id == Candidate.id,
+                ActivityCandidateAssociation.activity_id == activity_id
+            )
+        ).outerjoin(
+            Vote, and_(
+                Vote.candidate_id == Candidate.id,
+                Vote.activity_id == activity_id
+            )
+        )
+
+        # Apply college filter if provided
+        if college_id and college_id != 'all':
+            query = query.filter(Candidate.college_id == college_id)
+
+        return query.group_by(
+            Candidate.id,
+            ActivityCandidateAssociation.position
+        ).order_by(
+            ActivityCandidateAssociation.position
+        ).all()
+
     @staticmethod
     def get_candidates_for_export(db: Session, activity_id: int, college_id: Optional[str] = None):
         """
@@ -590,44 +994,19 @@ class VoteService:
         if not activity:
             raise ValueError(f"Activity with ID {activity_id} not found")
         
-        # Get candidate IDs for this activity
-        candidate_associations = db.query(ActivityCandidateAssociation).filter(
-            ActivityCandidateAssociation.activity_id == activity_id
-        ).order_by(ActivityCandidateAssociation.position).all()
-        
-        candidate_ids = [assoc.candidate_id for assoc in candidate_associations]
-        
-        # Query candidates
-        query = db.query(Candidate).filter(Candidate.id.in_(candidate_ids))
-        
-        # Apply college filter if provided
-        if college_id and college_id != 'all':
-            query = query.filter(Candidate.college_id == college_id)
-        
-        candidates = query.all()
-        
         # Format candidate information with vote counts
-        formatted_candidates = []
-        for candidate in candidates:
-            # Get vote count for this candidate in this activity
-            vote_count = db.query(Vote).filter(
-                Vote.candidate_id == candidate.id,
-                Vote.activity_id == activity_id
-            ).count()
-            
-            formatted_candidate = {
-                "id": candidate.id,
-                "name": candidate.name,
-                "college_id": candidate.college_id,
-                "college_name": candidate.college_name,
-                "photo": candidate.photo,
-                "bio": candidate.bio,
-                "vote_count": vote_count
+        return [
+            {
+                "id": row.id,
+                "name": row.name,
+                "college_id": row.college_id,
+                "college_name": row.college_name,
+                "photo": row.photo,
+                "bio": row.bio,
+                "vote_count": row.vote_count
             }
-            
-            formatted_candidates.append(formatted_candidate)
-        
-        return formatted_candidates
+            for row in VoteService._candidate_vote_counts(db, activity_id, college_id)
+        ]
     
     @staticmethod
     def get_vote_statistics(db: Session, activity_id: int, college_id: Optional[str] = None):
@@ -647,21 +1026,7 @@ class VoteService:
         if not activity:
             raise ValueError(f"Activity with ID {activity_id} not found")
         
-        # Get candidate IDs for this activity
-        candidate_associations = db.query(ActivityCandidateAssociation).filter(
-            ActivityCandidateAssociation.activity_id == activity_id
-        ).order_by(ActivityCandidateAssociation.position).all()
-        
-        candidate_ids = [assoc.candidate_id for assoc in candidate_associations]
-        
-        # Get candidates
-        query = db.query(Candidate).filter(Candidate.id.in_(candidate_ids))
-        
-        # Apply college filter if provided
-        if college_id and college_id != 'all':
-            query = query.filter(Candidate.college_id == college_id)
-        
-        candidates = query.all()
+        rows = VoteService._candidate_vote_counts(db, activity_id, college_id)
         
         # Calculate statistics
         statistics = {
@@ -670,47 +1035,30 @@ class VoteService:
                 "title": activity.title,
                 "start_time": activity.start_time,
                 "end_time": activity.end_time,
-                "total_candidates": len(candidates)
+                "total_candidates": len(rows)
             },
             "vote_counts": [],
             "college_participation": {}
         }
         
-        # Get vote counts for each candidate
-        for candidate in candidates:
-            vote_count = db.query(Vote).filter(
-                Vote.candidate_id == candidate.id,
-                Vote.activity_id == activity_id
-            ).count()
-            
+        # Vote counts and college totals in the same pass
+        college_votes = {}
+        for row in rows:
             statistics["vote_counts"].append({
-                "candidate_id": candidate.id,
-                "candidate_name": candidate.name,
-                "college_id": candidate.college_id,
-                "college_name": candidate.college_name,
-                "vote_count": vote_count
+                "candidate_id": row.id,
+                "candidate_name": row.name,
+                "college_id": row.college_id,
+                "college_name": row.college_name,
+                "vote_count": row.vote_count
             })
-        
-        # Calculate college participation statistics
-        college_votes = {}
-        
-        for candidate in candidates:
-            college_id = candidate.college_id
-            college_name = candidate.college_name
             
-            if college_id not in college_votes:
-                college_votes[college_id] = {
-                    "college_id": college_id,
-                    "college_name": college_name,
+            if row.college_id not in college_votes:
+                college_votes[row.college_id] = {
+                    "college_id": row.college_id,
+                    "college_name": row.college_name,
                     "total_votes": 0
                 }
-            
-            vote_count = db.query(Vote).filter(
-                Vote.candidate_id == candidate.id,
-                Vote.activity_id == activity_id
-            ).count()
-            
-            college_votes[college_id]["total_votes"] += vote_count
+            college_votes[row.college_id]["total_votes"] += row.vote_count
         
         statistics["college_participation"] = list(college_votes.values())
         
@@ -718,7 +1066,7 @@ class VoteService:
 
     @staticmethod
     async def get_candidate_stats(db: Session, activity_id: int, college_id: Optional[str] = None, 
-                         start_date: Optional[str] = None, end_date: Optional[str] = None):
+                         start_date: Optional[str] = None, end_date: Optional[str] = None, exact: bool = False):
         """
         获取候选人得票统计数据
         
@@ -728,34 +1076,36 @@ class VoteService:
             college_id: 可选的学院ID，用于筛选
             start_date: 可选的开始日期，格式YYYY-MM-DD
             end_date: 可选的结束日期，格式YYYY-MM-DD
+            exact: 是否精确统计投票人数；为False时进行中的活动使用HyperLogLog近似值，
+                已结束的活动始终精确统计
             
         Returns:
-            包含总人数和候选人得票记录的字典
+            包含总人数、总人数是否为近似值(approximate)和候选人得票记录的字典
         """
-        # 基础查询：获取每个候选人的得票数
+        # 基础查询：从分钟级预聚合表汇总每个候选人的得票数
         query = db.query(
             Candidate.id,
             Candidate.name,
             Candidate.college_id,
-            func.count(Vote.id).label('vote_count')
+            func.sum(VoteMinuteBucket.vote_count).label('vote_count')
         ).join(
-            Vote, Vote.candidate_id == Candidate.id
+            VoteMinuteBucket, VoteMinuteBucket.candidate_id == Candidate.id
         ).filter(
-            Vote.activity_id == activity_id
+            VoteMinuteBucket.activity_id == activity_id
         )
         
         # 应用学院筛选（如果提供了学院ID）
         if college_id and college_id != 'all':
             query = query.filter(Candidate.college_id == college_id)
         
-        # 应用日期范围筛选
+        # 应用日期范围筛选（日期边界都在整分钟上，与按投票时间筛选结果一致）
         if start_date:
             start_datetime = datetime.strptime(start_date, "%Y-%m-%d").replace(hour=0, minute=0, second=0)
-            query = query.filter(Vote.created_at >= start_datetime)
+            query = query.filter(VoteMinuteBucket.bucket_start >= start_datetime)
         
         if end_date:
             end_datetime = datetime.strptime(end_date, "%Y-%m-%d").replace(hour=23, minute=59, second=59)
-            query = query.filter(Vote.created_at <= end_datetime)
+            query = query.filter(VoteMinuteBucket.bucket_start <= end_datetime)
         
         # 按候选人分组并按得票数降序排序
         query = query.group_by(
@@ -767,32 +1117,48 @@ class VoteService:
         # 执行查询
         results = query.all()
         
-        # 格式化结果并添加排名
+        # 格式化结果并添加排名（名次与返回的得票数来自同一次查询）
         formatted_records = []
-        for rank, (candidate_id, candidate_name, college_id, vote_count) in enumerate(results, 1):
+        for position, (candidate_id, candidate_name, candidate_college_id, vote_count) in enumerate(results, 1):
             record = {
-                "rank": rank,
-                "college_id": college_id,
+                "rank": position,
+                "college_id": candidate_college_id,
                 "candidate_name": candidate_name,
-                "vote_count": vote_count
+                "vote_count": int(vote_count)
             }
             formatted_records.append(record)
         
         # 获取该活动的总投票人数（去重）
-        total_voters = db.query(func.count(func.distinct(Vote.voter_id))).filter(
-            Vote.activity_id == activity_id
-        ).scalar() or 0
-        
-        # 应用日期筛选到投票人数统计
-        voter_query = db.query(func.distinct(Vote.voter_id)).filter(Vote.activity_id == activity_id)
-        if start_date:
-            voter_query = voter_query.filter(Vote.created_at >= start_datetime)
-        if end_date:
-            voter_query = voter_query.filter(Vote.created_at <= end_datetime)
-        total_voters = voter_query.count()
+        total_voters = None
+        if not exact:
+            try:
+                activity = ActivityCache.get(db, activity_id)
+                # 已结束活动的结果是正式结果，使用精确统计
+                if activity and activity.end_time > datetime.now():
+                    total_voters = TurnoutCounter.count(
+                        db, activity_id,
+                        start=start_datetime.date() if start_date else None,
+                        end=end_datetime.date() if end_date else None,
+                        activity_start=activity.start_time,
+                        activity_end=activity.end_time
+                    )
+            except redis.RedisError as e:
+                VoteService.logger.error(f"读取近似投票人数失败，改用精确统计: {str(e)}")
+
+        if total_voters is None:
+            voter_query = db.query(func.count(func.distinct(Vote.voter_id))).filter(Vote.activity_id == activity_id)
+            if start_date:
+                voter_query = voter_query.filter(Vote.created_at >= start_datetime)
+            if end_date:
+                voter_query = voter_query.filter(Vote.created_at <= end_datetime)
+            total_voters = voter_query.scalar() or 0
+            approximate = False
+        else:
+            approximate = True
         
         return {
             "total_voters": total_voters,
+            "approximate": approximate,
             "records": formatted_records
         }
 
@@ -0,0 +1,155 @@
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from datetime import datetime, timedelta
+from typing import Optional, List, Dict, Iterable
+import argparse
+import asyncio
+import csv
+import json
+import logging
+
+from ..config import STUDENT_DIRECTORY_CONFIG
+from ..database import SessionLocal
+from ..http_client import HttpClientManager
+from ..models import StudentDirectory, Vote, VoteActivity
+from .export_cache import ExportCache
+from .student_info import StudentInfoService
+
+
+class StudentDirectoryService:
+    """
+    本地学生目录
+
+    支持从CSV/JSON文件批量导入，以及通过class101增量刷新。
+    导出和统计可直接将votes与student_directory关联，按投票人学院分组。
+    """
+    logger = logging.getLogger('vote_service')
+
+    UPSERT_BATCH_SIZE = 1000
+    FIELDS = ["name", "college_id", "college_name", "major", "grade", "student_type"]
+
+    @classmethod
+    def normalize(cls, record: Dict[str, str]) -> Optional[Dict[str, str]]:
+        """
+        统一导入记录格式，既支持class101原始字段（XGH、XM、YXDM...），
+        也支持与get_student_info相同的字段名
+
+        Returns:
+            规范化后的记录，缺少学号时返回None
+        """
+        staff_id = record.get("staff_id") or record.get("XGH")
+        if not staff_id:
+            return None
+        info = StudentInfoService.parse(record) if "XM" in record or "YXDM" in record else record
+        return {"staff_id": str(staff_id).strip(), **{field: info.get(field) or None for field in cls.FIELDS}}
+
+    @classmethod
+    def upsert(cls, db: Session, records: Iterable[Dict[str, str]]) -> int:
+        """批量写入或更新学生目录，返回写入条数"""
+        count = 0
+        batch = []
+        for record in records:
+            batch.append(record)
+            if len(batch) >= cls.UPSERT_BATCH_SIZE:
+                count += cls._upsert_batch(db, batch)
+                batch = []
+        if batch:
+            count += cls._upsert_batch(db, batch)
+        db.commit()
+        if count:
+            # 投票人学院变化会影响vote_records和college_turnout，使所有活动的导出缓存失效；
+            # 目录写入是低频的批量操作，不逐条计算受影响的活动
+            ExportCache.bump(*[activity_id for (activity_id,) in db.query(VoteActivity.id)])
+        return count
+
+    @classmethod
+    def _upsert_batch(cls, db: Session, batch: List[Dict[str, str]]) -> int:
+        stmt = mysql_insert(StudentDirectory).values(batch)
+        db.execute(stmt.on_duplicate_key_update(
+            **{field: getattr(stmt.inserted, field) for field in cls.FIELDS},
+            updated_at=datetime.now()
+        ))
+        return len(batch)
+
+    @classmethod
+    def import_file(cls, db: Session, path: str) -> int:
+        """
+        从CSV或JSON文件导入学生目录
+
+        Args:
+            db: 数据库会话
+            path: 文件路径，.json 为记录数组，其余按带表头的CSV处理
+
+        Returns:
+            导入条数
+        """
+        with open(path, 'r', encoding='utf-8-sig') as f:
+            raw = json.load(f) if path.lower().endswith('.json') else csv.DictReader(f)
+            records = (cls.normalize(record) for record in raw)
+            return cls.upsert(db, (record for record in records if record))
+
+    @classmethod
+    async def refresh(cls, db: Session, batch_size: Optional[int] = None) -> int:
+        """
+        增量刷新：查询目录中还没有的投票人，以及超过refresh_age_days未更新的条目
+
+        Returns:
+            本次更新的条数
+        """
+        batch_size = batch_size or STUDENT_DIRECTORY_CONFIG["refresh_batch_size"]
+        missing = [
+            voter_id for (voter_id,) in db.query(Vote.voter_id).outerjoin(
+                StudentDirectory, StudentDirectory.staff_id == Vote.voter_id
+            ).filter(
+                StudentDirectory.staff_id.is_(None)
+            ).distinct().limit(batch_size)
+        ]
+        stale_before = datetime.now() - timedelta(days=STUDENT_DIRECTORY_CONFIG["refresh_age_days"])
+        stale = [
+            staff_id for (staff_id,) in db.query(StudentDirectory.staff_id).filter(
+                StudentDirectory.updated_at < stale_before
+            ).order_by(StudentDirectory.updated_at).limit(max(batch_size - len(missing), 0))
+        ]
+
+        students = await StudentInfoService.get_many(missing + stale)
+        records = [
+            {"staff_id": staff_id, **{field: info.get(field) or None for field in cls.FIELDS}}
+            for staff_id, info in students.items()
+            if not StudentInfoService.is_fallback(info)
+        ]
+        count = cls.upsert(db, records)
+        cls.logger.info(f"学生目录刷新完成：新增候选 {len(missing)}，过期候选 {len(stale)}，更新 {count}")
+        return count
+
+
+async def _refresh(db: Session, batch_size: Optional[int]) -> int:
+    try:
+        return await StudentDirectoryService.refresh(db, batch_size)
+    finally:
+        await HttpClientManager.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地学生目录维护")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    import_parser = subparsers.add_parser("import", help="从CSV/JSON文件导入")
+    import_parser.add_argument("path")
+    refresh_parser = subparsers.add_parser("refresh", help="通过class101增量刷新")
+    refresh_parser.add_argument("--batch-size", type=int, default=None)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if args.command == "import":
+            count = StudentDirectoryService.import_file(db, args.path)
+        else:
+            count = asyncio.run(_refresh(db, args.batch_size))
+        print(f"写入 {count} 条学生目录记录")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    # python -m backend.src.vote.student_directory import students.csv
+    # python -m backend.src.vote.student_directory refresh
+    main()
@@ -0,0 +1,230 @@
+from collections import OrderedDict
+from typing import Optional, List, Dict, Tuple
+import asyncio
+import json
+import logging
+import threading
+import time
+
+import httpx
+
+from ..auth.service import AuthService
+from ..circuit_breaker import CircuitBreaker
+from ..config import STUDENT_INFO_CONFIG
+from ..http_client import HttpClientManager
+
+
+class StudentInfoService:
+    """
+    学生信息查询
+
+    两级缓存：进程内LRU + Redis。查询成功的结果缓存较长时间，
+    查无此人或接口出错时只缓存较短时间（负缓存），避免反复请求class101。
+    缓存未命中的条目通过应用共享的HTTP客户端并发查询，并发数和总时限可配置；
+    class101连续出错时熔断，熔断期间直接返回保底数据而不再等待超时。
+    """
+    logger = logging.getLogger('vote_service')
+
+    # 查询不到学生信息时使用的保底数据
+    FALLBACK_INFO = {
+        "name": "保底数据",
+        "college_id": "0503000",
+        "college_name": "自动化学院",
+        "major": "控制科学与工程",
+        "grade": "2023",
+        "student_type": "研究生"
+    }
+
+    # 熔断器拒绝请求时的占位结果，不写入缓存
+    _REJECTED = object()
+
+    _lock = threading.Lock()
+    _local: "OrderedDict[str, Tuple[float, Optional[Dict[str, str]]]]" = OrderedDict()
+
+    @classmethod
+    def is_fallback(cls, info: Optional[Dict[str, str]]) -> bool:
+        """判断get_many返回的条目是否为保底数据或未完成查询"""
+        return info is None or info is cls.FALLBACK_INFO
+
+    @staticmethod
+    def _key(stuff_id: str) -> str:
+        return f"student_info:{stuff_id}"
+
+    @staticmethod
+    def parse(record: Dict[str, str]) -> Dict[str, str]:
+        """将class101返回的记录转换为学生信息字典"""
+        return {
+            "name": record.get("XM", ""),
+            "college_id": record.get("YXDM", ""),
+            "college_name": record.get("YXDM_TEXT", ""),
+            "major": record.get("ZYMD_TEXT", ""),
+            "grade": record.get("NJ", ""),
+            "student_type": record.get("RYBQDM_TEXT", "")
+        }
+
+    @classmethod
+    async def fetch(cls, client: httpx.AsyncClient, stuff_id: str) -> Optional[Dict[str, str]]:
+        """
+        直接请求class101查询学生信息
+
+        调用方需先通过熔断器的 allow_request 放行，本方法负责记录调用结果
+
+        Returns:
+            学生信息字典，查无此人或请求失败时返回None
+        """
+        breaker = CircuitBreaker.get("class101")
+        recorded = False
+        try:
+            response = await client.get(
+                STUDENT_INFO_CONFIG["url"].format(stuff_id=stuff_id),
+                timeout=STUDENT_INFO_CONFIG["request_timeout"]
+            )
+            recorded = True
+            if response.status_code >= 500:
+                breaker.record_failure(f"HTTP {response.status_code}")
+                return None
+            breaker.record_success()
+            if response.status_code == 200:
+                data = response.json()
+                if data and len(data) > 0:
+                    return cls.parse(data[0])
+        except httpx.HTTPError as e:
+            breaker.record_failure(f"{type(e).__name__}: {str(e)}")
+            recorded = True
+            cls.logger.error(f"Error fetching student info: {str(e)}")
+        except Exception as e:
+            cls.logger.error(f"Error fetching student info: {str(e)}")
+        finally:
+            # 超过批量时限被取消或出现其他异常时没有结果，不计入失败率，归还探测名额
+            if not recorded:
+                breaker.release()
+        return None
+
+    @classmethod
+    def _get_local(cls, stuff_id: str) -> Tuple[bool, Optional[Dict[str, str]]]:
+        with cls._lock:
+            entry = cls._local.get(stuff_id)
+            if entry is None:
+                return False, None
+            expires_at, info = entry
+            if expires_at < time.monotonic():
+                del cls._local[stuff_id]
+                return False, None
+            cls._local.move_to_end(stuff_id)
+            return True, info
+
+    @classmethod
+    def _set_local(cls, stuff_id: str, info: Optional[Dict[str, str]], ttl: int):
+        with cls._lock:
+            cls._local[stuff_id] = (time.monotonic() + ttl, info)
+            cls._local.move_to_end(stuff_id)
+            while len(cls._local) > STUDENT_INFO_CONFIG["local_max_size"]:
+                cls._local.popitem(last=False)
+
+    @staticmethod
+    def _ttl(info: Optional[Dict[str, str]]) -> int:
+        return STUDENT_INFO_CONFIG["hit_ttl"] if info else STUDENT_INFO_CONFIG["miss_ttl"]
+
+    @classmethod
+    def _get_redis_many(cls, stuff_ids: List[str]) -> Dict[str, Optional[Dict[str, str]]]:
+        """从Redis批量读取，返回命中的条目（值为None表示负缓存）"""
+        found = {}
+        try:
+            values = AuthService.redis_client.mget([cls._key(stuff_id) for stuff_id in stuff_ids])
+        except Exception as e:
+            cls.logger.error(f"读取学生信息缓存失败: {str(e)}")
+            return found
+        for stuff_id, value in zip(stuff_ids, values):
+            if value is not None:
+                info = json.loads(value)
+                found[stuff_id] = info
+                # Redis剩余有效期未知，进程内缓存只保留负缓存时长
+                cls._set_local(stuff_id, info, STUDENT_INFO_CONFIG["miss_ttl"])
+        return found
+
+    @classmethod
+    def _store(cls, results: Dict[str, Optional[Dict[str, str]]]):
+        try:
+            pipe = AuthService.redis_client.pipeline(transaction=False)
+            for stuff_id, info in results.items():
+                pipe.set(cls._key(stuff_id), json.dumps(info, ensure_ascii=False), ex=cls._ttl(info))
+            pipe.execute()
+        except Exception as e:
+            cls.logger.error(f"写入学生信息缓存失败: {str(e)}")
+        for stuff_id, info in results.items():
+            cls._set_local(stuff_id, info, cls._ttl(info))
+
+    @classmethod
+    async def _fetch_many(cls, stuff_ids: List[str], timeout: float) -> Dict[str, Optional[Dict[str, str]]]:
+        """
+        并发查询class101，超过时限仍未完成的请求会被取消，
+        熔断期间被拒绝的请求立即结束
+
+        Returns:
+            已完成查询的结果，未完成或被熔断的工号不在字典中
+        """
+        client = HttpClientManager.get_client()
+        breaker = CircuitBreaker.get("class101")
+        semaphore = asyncio.Semaphore(STUDENT_INFO_CONFIG["concurrency"])
+
+        async def fetch_one(stuff_id: str):
+            async with semaphore:
+                # 排队期间熔断器可能已经打开，发请求前再判断
+                if not breaker.allow_request():
+                    return stuff_id, cls._REJECTED
+                return stuff_id, await cls.fetch(client, stuff_id)
+
+        tasks = [asyncio.create_task(fetch_one(stuff_id)) for stuff_id in stuff_ids]
+        done, pending = await asyncio.wait(tasks, timeout=max(timeout, 0))
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+            cls.logger.warning(f"学生信息查询超时，{len(pending)}/{len(tasks)} 条未完成")
+        results = dict(task.result() for task in done)
+        rejected = [stuff_id for stuff_id, info in results.items() if info is cls._REJECTED]
+        if rejected:
+            cls.logger.warning(f"class101熔断中，{len(rejected)} 条学生信息直接使用保底数据")
+        return {stuff_id: info for stuff_id, info in results.items() if info is not cls._REJECTED}
+
+    @classmethod
+    async def get_many(cls, stuff_ids: List[str], deadline: Optional[float] = None) -> Dict[str, Optional[Dict[str, str]]]:
+        """
+        批量查询学生信息，依次查进程内缓存、Redis和class101
+
+        Args:
+            stuff_ids: 工号列表
+            deadline: 总时限（秒），默认使用配置中的deadline
+
+        Returns:
+            按传入顺序排列的工号到学生信息的字典；查无此人时为保底数据，
+            在时限内未完成查询时为None
+        """
+        started = time.monotonic()
+        deadline = STUDENT_INFO_CONFIG["deadline"] if deadline is None else deadline
+        found: Dict[str, Optional[Dict[str, str]]] = {}
+        missing = []
+        for stuff_id in dict.fromkeys(stuff_ids):
+            hit, info = cls._get_local(stuff_id)
+            if hit:
+                found[stuff_id] = info
+            else:
+                missing.append(stuff_id)
+
+        if missing:
+            found.update(cls._get_redis_many(missing))
+            missing = [stuff_id for stuff_id in missing if stuff_id not in found]
+
+        if missing:
+            fetched = await cls._fetch_many(missing, deadline - (time.monotonic() - started))
+            cls._store(fetched)
+            found.update(fetched)
+
+        return {
+            stuff_id: (found[stuff_id] or cls.FALLBACK_INFO) if stuff_id in found else None
+            for stuff_id in stuff_ids
+        }
+
+    @classmethod
+    async def get(cls, stuff_id: str) -> Dict[str, str]:
+        return (await cls.get_many([stuff_id]))[stuff_id] or cls.FALLBACK_INFO
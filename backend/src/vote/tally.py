@@ -0,0 +1,160 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import func
+from typing import Optional, List, Dict, Any
+import logging
+import threading
+
+from ..auth.service import AuthService
+from ..config import TALLY_CONFIG
+from ..database import SessionLocal
+from ..models import Vote, VoteActivity
+from .leaderboard import Leaderboard
+from .rebuild_guard import RebuildGuard
+
+
+class TallyStore:
+    """
+    每个活动的候选人实时计票（Redis HASH: candidate_id -> 票数）
+
+    选票提交后通过HINCRBY增量更新，统计接口直接读取计数；
+    计数缺失时从votes表重建，后台校准任务定期用votes表的聚合结果覆盖计数；
+    重建通过写入序号与并发的增量更新互斥（见RebuildGuard）。
+    """
+    logger = logging.getLogger('vote_service')
+
+    _thread: Optional[threading.Thread] = None
+    _stop_event = threading.Event()
+
+    @staticmethod
+    def _key(activity_id: int) -> str:
+        return f"vote:tally:{activity_id}"
+
+    @staticmethod
+    def _ready_key(activity_id: int) -> str:
+        return f"vote:tally:{activity_id}:ready"
+
+    @staticmethod
+    def _seq_key(activity_id: int) -> str:
+        return f"vote:tally:{activity_id}:seq"
+
+    @classmethod
+    def record_ballots(cls, ballots: List[Dict[str, Any]]):
+        """
+        选票提交后增加计数
+
+        Args:
+            ballots: 已提交的选票列表，每项包含activity_id和candidate_ids
+        """
+        pipe = AuthService.redis_client.pipeline(transaction=False)
+        activity_ids = set()
+        for ballot in ballots:
+            activity_ids.add(ballot["activity_id"])
+            key = cls._key(ballot["activity_id"])
+            for cid in ballot["candidate_ids"]:
+                pipe.hincrby(key, cid, 1)
+            pipe.incr(cls._seq_key(ballot["activity_id"]))
+        # 通知各worker的实时结果推送
+        for activity_id in activity_ids:
+            pipe.publish(TALLY_CONFIG["update_channel"], activity_id)
+        pipe.execute()
+
+    @classmethod
+    def rebuild(cls, db: Session, activity_id: int) -> Dict[int, int]:
+        """
+        从votes表重建活动的计票
+
+        Returns:
+            votes表中的计数；重建期间持续有选票写入而未覆盖时，返回Redis中的现有计数
+        """
+        def load() -> Dict[int, int]:
+            return {
+                candidate_id: vote_count for candidate_id, vote_count in db.query(
+                    Vote.candidate_id,
+                    func.count(Vote.id)
+                ).filter(
+                    Vote.activity_id == activity_id
+                ).group_by(
+                    Vote.candidate_id
+                )
+            }
+
+        def write(pipe, counts: Dict[int, int]):
+            pipe.delete(cls._key(activity_id))
+            if counts:
+                pipe.hset(cls._key(activity_id), mapping=counts)
+            pipe.set(cls._ready_key(activity_id), 1)
+
+        counts = RebuildGuard.run(db, cls._seq_key(activity_id), load, write)
+        if counts is None:
+            return cls._read(activity_id)
+        return counts
+
+    @classmethod
+    def _read(cls, activity_id: int) -> Dict[int, int]:
+        return {
+            int(cid): int(count)
+            for cid, count in AuthService.redis_client.hgetall(cls._key(activity_id)).items()
+        }
+
+    @classmethod
+    def get_counts(cls, db: Session, activity_id: int) -> Dict[int, int]:
+        """
+        读取活动的计票，计数不存在时先重建
+
+        Returns:
+            候选人ID到票数的字典
+        """
+        if not AuthService.redis_client.exists(cls._ready_key(activity_id)):
+            return cls.rebuild(db, activity_id)
+        return cls._read(activity_id)
+
+    @classmethod
+    def clear(cls, activity_id: int):
+        try:
+            AuthService.redis_client.delete(cls._key(activity_id), cls._ready_key(activity_id), cls._seq_key(activity_id))
+        except Exception as e:
+            cls.logger.error(f"清理活动计票失败: {str(e)}")
+
+    @classmethod
+    def reconcile_active(cls, db: Session) -> List[int]:
+        """用votes表的聚合结果校准所有激活活动的计票和排行榜"""
+        activity_ids = [
+            activity_id for (activity_id,) in
+            db.query(VoteActivity.id).filter(VoteActivity.is_active == True)
+        ]
+        for activity_id in activity_ids:
+            cls.rebuild(db, activity_id)
+            Leaderboard.rebuild(db, activity_id)
+        return activity_ids
+
+    @classmethod
+    def _run(cls):
+        interval = TALLY_CONFIG["reconcile_interval"]
+        while not cls._stop_event.wait(interval):
+            try:
+                # 多个worker之间只让一个执行校准
+                if not AuthService.redis_client.set("vote:tally:reconcile_lock", 1, nx=True, ex=interval):
+                    continue
+                db = SessionLocal()
+                try:
+                    cls.reconcile_active(db)
+                finally:
+                    db.close()
+            except Exception as e:
+                cls.logger.error(f"计票校准失败: {str(e)}")
+
+    @classmethod
+    def start_reconciler(cls):
+        if cls._thread and cls._thread.is_alive():
+            return
+        cls._stop_event.clear()
+        cls._thread = threading.Thread(target=cls._run, name="tally-reconciler", daemon=True)
+        cls._thread.start()
+
+    @classmethod
+    def stop_reconciler(cls):
+        if not cls._thread:
+            return
+        cls._stop_event.set()
+        cls._thread.join(timeout=5)
+        cls._thread = None
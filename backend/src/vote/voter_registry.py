@@ -0,0 +1,157 @@
+from sqlalchemy.orm import Session
+from typing import List, Set
+import logging
+import uuid
+
+from ..auth.service import AuthService
+from ..config import VOTER_REGISTRY_CONFIG
+from ..models import Vote, VoteActivity
+
+
+class VoterRegistry:
+    """
+    每个活动已投票人员集合（Redis SET）
+
+    投票前通过SADD原子地占位，返回0说明该投票人已经投过票，
+    以此替代 SELECT COUNT(*) 的重复投票检查并消除并发重复提交。
+    占位的同时写入一个带过期时间的处理中标记；集合中已有该投票人但标记已过期、
+    votes表中也没有其选票时，视为写入中断残留的占位，允许重新占位。
+    集合可随时从votes表重建。
+    """
+    logger = logging.getLogger('vote_service')
+
+    REBUILD_CHUNK_SIZE = 5000
+
+    # Redis不可用时改用数据库检查过的活动，恢复后需重建集合
+    _stale: Set[int] = set()
+
+    @staticmethod
+    def _key(activity_id: int) -> str:
+        return f"vote:voters:{activity_id}"
+
+    @staticmethod
+    def _ready_key(activity_id: int) -> str:
+        return f"vote:voters:{activity_id}:ready"
+
+    @staticmethod
+    def _claim_key(activity_id: int, voter_id: str) -> str:
+        return f"vote:voters:{activity_id}:claim:{voter_id}"
+
+    @classmethod
+    def rebuild(cls, db: Session, activity_id: int) -> int:
+        """
+        从votes表重建活动的已投票集合
+
+        先写入临时key再RENAME替换原集合，不再保留残留的占位；
+        替换后补回仍在处理中（标记未过期）的占位，队列中尚未落库的选票不会被重复投票
+
+        Returns:
+            写入的投票人数量
+        """
+        client = AuthService.redis_client
+        key = cls._key(activity_id)
+        tmp_key = f"{key}:rebuild:{uuid.uuid4().hex}"
+        count = 0
+        chunk = []
+        query = db.query(Vote.voter_id).filter(Vote.activity_id == activity_id).distinct()
+        for (voter_id,) in query.yield_per(cls.REBUILD_CHUNK_SIZE):
+            chunk.append(voter_id)
+            if len(chunk) >= cls.REBUILD_CHUNK_SIZE:
+                client.sadd(tmp_key, *chunk)
+                count += len(chunk)
+                chunk = []
+        if chunk:
+            client.sadd(tmp_key, *chunk)
+            count += len(chunk)
+
+        pipe = client.pipeline(transaction=True)
+        if count:
+            pipe.rename(tmp_key, key)
+        else:
+            pipe.delete(key)
+        pipe.set(cls._ready_key(activity_id), 1)
+        pipe.execute()
+
+        prefix = cls._claim_key(activity_id, "")
+        claimed = [
+            claim_key[len(prefix):] for claim_key in
+            (k.decode() if isinstance(k, bytes) else k for k in client.scan_iter(match=f"{prefix}*", count=1000))
+        ]
+        if claimed:
+            client.sadd(key, *claimed)
+        cls._stale.discard(activity_id)
+        cls.logger.info(f"已重建活动 {activity_id} 的投票人集合，共 {count} 人，处理中 {len(claimed)} 人")
+        return count
+
+    @classmethod
+    def rebuild_active(cls, db: Session) -> List[int]:
+        """启动时重建所有激活活动的投票人集合"""
+        activity_ids = [
+            activity_id for (activity_id,) in
+            db.query(VoteActivity.id).filter(VoteActivity.is_active == True)
+        ]
+        for activity_id in activity_ids:
+            cls.rebuild(db, activity_id)
+        return activity_ids
+
+    @classmethod
+    def ensure_loaded(cls, db: Session, activity_id: int):
+        if activity_id in cls._stale or not AuthService.redis_client.exists(cls._ready_key(activity_id)):
+            cls.rebuild(db, activity_id)
+
+    @classmethod
+    def claim(cls, db: Session, activity_id: int, voter_id: str) -> bool:
+        """
+        为投票人占位
+
+        Returns:
+            True 表示占位成功；False 表示该投票人已经投过票或有相同投票人的选票正在处理
+        """
+        cls.ensure_loaded(db, activity_id)
+        pipe = AuthService.redis_client.pipeline(transaction=True)
+        pipe.sadd(cls._key(activity_id), voter_id)
+        pipe.set(cls._claim_key(activity_id, voter_id), 1, nx=True, ex=VOTER_REGISTRY_CONFIG["claim_ttl"])
+        added, marked = pipe.execute()
+        if added:
+            return True
+        if not marked:
+            # 同一投票人的选票仍在处理中
+            return False
+        # 集合中的占位已没有处理中标记，以votes表为准
+        if db.query(Vote.id).filter(Vote.voter_id == voter_id, Vote.activity_id == activity_id).first() is None:
+            cls.logger.warning(f"活动 {activity_id} 投票人 {voter_id} 的占位没有对应选票，已重新占位")
+            return True
+        return False
+
+    @classmethod
+    def release(cls, activity_id: int, voter_id: str):
+        """选票写入失败时释放占位"""
+        try:
+            AuthService.redis_client.srem(cls._key(activity_id), voter_id)
+            AuthService.redis_client.delete(cls._claim_key(activity_id, voter_id))
+        except Exception as e:
+            cls.logger.error(f"释放投票占位失败: {str(e)}")
+
+    @classmethod
+    def mark_stale(cls, activity_id: int):
+        """
+        Redis不可用、改用数据库检查重复投票后调用
+
+        期间投票的人员不在集合中，清除ready标记使集合在下次占位前从votes表重建；
+        Redis仍不可用时在进程内记录，恢复后由本worker重建
+        """
+        cls._stale.add(activity_id)
+        try:
+            AuthService.redis_client.delete(cls._ready_key(activity_id))
+        except Exception as e:
+            cls.logger.error(f"清除投票人集合就绪标记失败: {str(e)}")
+
+    @classmethod
+    def clear(cls, activity_id: int):
+        """活动删除后清理其投票人集合"""
+        try:
+            client = AuthService.redis_client
+            claim_keys = list(client.scan_iter(match=f"{cls._claim_key(activity_id, '')}*", count=1000))
+            client.delete(cls._key(activity_id), cls._ready_key(activity_id), *claim_keys)
+        except Exception as e:
+            cls.logger.error(f"清理投票人集合失败: {str(e)}")
@@ -0,0 +1,89 @@
+"""
+导出统计的SQL语句数回归测试
+
+在内存SQLite中建表并统计 get_vote_statistics / get_candidates_for_export
+执行的语句数，候选人数量增加时语句数不应随之增长。
+在仓库根目录运行: python -m pytest backend/tests
+"""
+from datetime import datetime, timedelta
+import os
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+# VoteService 的日志写入工作目录下的 logs/
+os.makedirs("logs", exist_ok=True)
+
+from backend.src.database import Base
+from backend.src.models import ActivityCandidateAssociation, Candidate, Vote, VoteActivity
+from backend.src.vote.service import VoteService
+
+CANDIDATES = 60
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+
+@pytest.fixture
+def activity_id(db):
+    now = datetime.now()
+    activity = VoteActivity(title="测试活动", description="", start_time=now - timedelta(days=1),
+                            end_time=now + timedelta(days=1), is_active=True, max_votes=12, min_votes=1)
+    db.add(activity)
+    db.flush()
+    for i in range(CANDIDATES):
+        candidate = Candidate(name=f"候选人{i}", college_id=f"05{i % 3:02d}000", college_name=f"学院{i % 3}", bio="")
+        db.add(candidate)
+        db.flush()
+        # position 与插入顺序相反，验证按活动中的顺序返回
+        db.add(ActivityCandidateAssociation(activity_id=activity.id, candidate_id=candidate.id,
+                                            position=CANDIDATES - i))
+        for v in range(i % 4):
+            db.add(Vote(candidate_id=candidate.id, activity_id=activity.id, voter_id=f"{i}-{v}"))
+    db.commit()
+    db.expire_all()
+    return activity.id
+
+
+@pytest.fixture
+def statements(db):
+    executed = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    engine = db.get_bind()
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    yield executed
+    event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def test_vote_statistics_query_count(db, activity_id, statements):
+    statistics = VoteService.get_vote_statistics(db, activity_id)
+
+    # 活动信息 + 一条分组聚合
+    assert len(statements) == 2
+    assert statistics["activity_info"]["total_candidates"] == CANDIDATES
+    assert [item["candidate_name"] for item in statistics["vote_counts"]][:2] == ["候选人59", "候选人58"]
+    assert sum(item["vote_count"] for item in statistics["vote_counts"]) == sum(i % 4 for i in range(CANDIDATES))
+    assert sum(c["total_votes"] for c in statistics["college_participation"]) == \
+        sum(item["vote_count"] for item in statistics["vote_counts"])
+
+
+def test_candidates_for_export_query_count(db, activity_id, statements):
+    candidates = VoteService.get_candidates_for_export(db, activity_id, college_id="0501000")
+
+    assert len(statements) == 2
+    assert candidates and all(c["college_id"] == "0501000" for c in candidates)
+    assert all(c["vote_count"] == int(c["name"][3:]) % 4 for c in candidates)
@@ -29,6 +29,7 @@ export interface ExportResponse {
   data: {
     total_voters: number;
     records: VoteRecord[] | CandidateStats[];
+    next_cursor?: string | null;
   };
 }
 